@@ -0,0 +1 @@
+# Benchmarks of the trading package, run them with `python -m benchmarks`.
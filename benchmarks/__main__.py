@@ -0,0 +1,55 @@
+# Command line entry point: python -m benchmarks
+import argparse
+import json
+import os
+import sys
+from benchmarks import suite
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks',
+                                     description='Benchmarks of the trading package.')
+    parser.add_argument('--scenario', action='append', choices=list(suite.SCENARIOS),
+                        help='scenario to run (can be repeated), all by default')
+    parser.add_argument('--case', action='append', choices=list(suite.CASES),
+                        help='case to run (can be repeated), all by default')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs of each case')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='fraction of the days and paths to use, for quick runs')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='JSON file with the baseline results')
+    parser.add_argument('--save-baseline', action='store_true', help='store these results as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed slowdown before reporting a regression (0.2 = 20%%)')
+    parser.add_argument('--output', help='also write the results to this JSON file')
+    args = parser.parse_args(argv)
+
+    results = suite.run(args.scenario, args.case, args.repeat, args.scale)
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    if baseline is not None:
+        try:
+            regressions = suite.compare(results, baseline, args.tolerance)
+        except ValueError as error:
+            parser.error(str(error) + ', run with the same --scale or save a new baseline')
+    print(suite.report(results, baseline))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print('Baseline saved to', args.baseline)
+        return 0
+    if baseline is None:
+        return 0
+    for key, ratio in regressions.items():
+        print('Regression: {} is {:.2f}x slower than the baseline'.format(key, ratio))
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
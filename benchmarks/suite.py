@@ -0,0 +1,229 @@
+# Benchmark scenarios and cases for the trading package.
+import os
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import trading.backtest as bt
+import trading.data as data
+import trading.indicators as indi
+import trading.performance as perf
+import trading.process as proc
+
+
+# The data file of the repository, found from any working directory
+DATAFILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'stock_data_5y.txt')
+
+
+def file_prices(datafile=DATAFILE):
+    '''
+    The 20 stocks x 1825 days of the data file.
+    '''
+    return np.array(data.get_data('read', datafile=datafile))
+
+
+def synthetic_prices(days=3650, stocks=500, seed=0):
+    '''
+    A synthetic universe: 500 stocks over 10 years by default.
+    '''
+    rng = np.random.default_rng(seed)
+    initial_price = rng.uniform(50, 600, stocks)
+    volatility = rng.uniform(0.2, 2, stocks)
+    return data.generate_stock_paths(days, initial_price, volatility, seed=seed)[:, :, 0]
+
+
+def generate(prices, n_paths=1, chunk=1000, seed=0):
+    '''
+    Generates as many paths as the scenario has, chunk paths at a time.
+    Returns the number of prices generated.
+    '''
+    days, stocks = prices.shape
+    initial_price = np.nan_to_num(prices[0], nan=100.0)
+    volatility = np.full(stocks, 1.0)
+    done = 0
+    while done < n_paths:
+        number = min(chunk, n_paths - done)
+        data.generate_stock_paths(days, initial_price, volatility, n_paths=number, seed=seed + done)
+        done += number
+    return days * stocks * n_paths
+
+
+def moving_averages(prices):
+    '''
+    Fast and slow simple moving averages, and a weighted one.
+    Returns the number of prices.
+    '''
+    indi.moving_average(prices, 50)
+    indi.moving_average(prices, 200)
+    indi.moving_average(prices, 7, list(range(1, 8)))
+    return prices.size
+
+
+def oscillators(prices):
+    '''
+    Stochastic and RSI oscillators. Returns the number of prices.
+    '''
+    indi.oscillator(prices, 7, 'stochastic')
+    indi.oscillator(prices, 7, 'RSI')
+    return prices.size
+
+
+def orders(prices, every=7):
+    '''
+    One purchase or sale of every stock every few days, one call to
+    proc.buy() or proc.sell() per trade. Returns the number of trades.
+    '''
+    portfolio = [0] * prices.shape[1]
+    ledger = proc.Ledger()
+    for day in range(1, len(prices), every):
+        for stock in range(prices.shape[1]):
+            if (day // every) % 2:
+                proc.buy(day, stock, 5000, prices, 20, portfolio, ledger)
+            else:
+                proc.sell(day, stock, prices, 20, portfolio, ledger)
+    return len(ledger)
+
+
+def signal_orders(prices):
+    '''
+    Crossing-average signals executed by the backtest engine. Returns the number of trades.
+    '''
+    buy, sell = bt.crossing_signals(indi.moving_average(prices, 50), indi.moving_average(prices, 200))
+    ledger = proc.Ledger()
+    bt.run_signals(buy, sell, prices, 5000, 20, [0] * prices.shape[1], ledger)
+    return len(ledger)
+
+
+def ledger_analysis(prices):
+    '''
+    Writes a text ledger of random trades, reads it back and computes its statistics.
+    Returns the number of transactions read.
+    '''
+    rng = np.random.default_rng(0)
+    buy = rng.random(prices.shape) < 0.05
+    sell = rng.random(prices.shape) < 0.05
+    with tempfile.TemporaryDirectory() as folder:
+        ledger_file = os.path.join(folder, 'ledger.txt')
+        bt.run_signals(buy, sell, prices, 5000, 20, [0] * prices.shape[1], ledger_file)
+        transactions = perf.read_transactions(ledger_file)
+        perf.ledger_stats(transactions, prices)
+    return len(transactions)
+
+
+# Each case: function to time, unit of the work count it returns
+CASES = {
+    'generate': (generate, 'prices'),
+    'moving_average': (moving_averages, 'prices'),
+    'oscillator': (oscillators, 'prices'),
+    'buy_sell': (orders, 'trades'),
+    'run_signals': (signal_orders, 'trades'),
+    'read_ledger': (ledger_analysis, 'trades'),
+}
+
+# Each scenario: (price data builder, cases with their extra arguments)
+SCENARIOS = {
+    'file': (file_prices, {name: {} for name in CASES}),
+    'synthetic': (synthetic_prices, {name: {} for name in CASES}),
+    'montecarlo': (lambda: file_prices()[:, :1], {'generate': {'n_paths': 10000}}),
+}
+
+
+def measure(function, args, kwargs, repeat=3):
+    '''
+    Times a benchmark case, then runs it once more under tracemalloc.
+
+    Output:
+        seconds (float): best time over repeat runs.
+        work (int): the work count returned by the case.
+        peak_mb (float): peak memory allocated during the run, in MB.
+    '''
+    seconds = np.inf
+    for i in range(repeat):
+        start = time.perf_counter()
+        work = function(*args, **kwargs)
+        seconds = min(seconds, time.perf_counter() - start)
+    # Memory is measured apart, tracemalloc slows everything down
+    tracemalloc.start()
+    function(*args, **kwargs)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, work, peak / 2**20
+
+
+def run(scenarios=None, cases=None, repeat=3, scale=1.0):
+    '''
+    Runs the benchmarks.
+
+    Input:
+        scenarios (list, default None): names of the scenarios to run, all if None.
+        cases (list, default None): names of the cases to run, all if None.
+        repeat (int, default 3): number of timed runs of each case.
+        scale (float, default 1.0): fraction of the days (and paths) to use, for quick runs.
+
+    Output:
+        results (dict): for each 'scenario/case', a dict with 'seconds', 'work',
+            'unit', 'throughput' (work per second), 'peak_mb' and 'scale'.
+    '''
+    results = {}
+    for scenario in scenarios or SCENARIOS:
+        builder, scenario_cases = SCENARIOS[scenario]
+        prices = builder()
+        prices = prices[:max(int(len(prices) * scale), 250)]
+        for name, kwargs in scenario_cases.items():
+            if cases is not None and name not in cases:
+                continue
+            function, unit = CASES[name]
+            kwargs = dict(kwargs)
+            if 'n_paths' in kwargs:
+                kwargs['n_paths'] = max(int(kwargs['n_paths'] * scale), 1)
+            seconds, work, peak_mb = measure(function, (prices,), kwargs, repeat)
+            results[scenario + '/' + name] = {'seconds': seconds, 'work': work, 'unit': unit,
+                                              'throughput': work / seconds, 'peak_mb': peak_mb, 'scale': scale}
+    return results
+
+
+def slowdown(result, base):
+    '''
+    How many times slower a case is than in the baseline, from their throughputs
+    (the work done per second does not depend on the size of the data, the time does).
+    '''
+    return base['throughput'] / result['throughput']
+
+
+def compare(results, baseline, tolerance=0.2):
+    '''
+    Finds the cases slower than in the baseline.
+
+    Input:
+        results (dict): output of run().
+        baseline (dict): results of an earlier run(), with the same scale.
+        tolerance (float, default 0.2): allowed slowdown, as a fraction of the baseline time.
+
+    Output:
+        regressions (dict): for each slower case, its slowdown (see slowdown()).
+    '''
+    regressions = {}
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        base_scale = baseline[key]['scale']
+        if base_scale != result['scale']:
+            raise ValueError('The baseline of ' + key + ' was run with --scale ' + str(base_scale)
+                             + ', not ' + str(result['scale']))
+        if slowdown(result, baseline[key]) > 1 + tolerance:
+            regressions[key] = slowdown(result, baseline[key])
+    return regressions
+
+
+def report(results, baseline=None):
+    '''
+    Formats the results as a table, with the slowdown from the baseline if given.
+    '''
+    lines = ['{:<28} {:>10} {:>19} {:>10} {:>9}'.format('case', 'seconds', 'throughput', 'peak MB', 'vs base')]
+    for key, result in results.items():
+        ratio = ''
+        if baseline and key in baseline:
+            ratio = '{:.2f}x'.format(slowdown(result, baseline[key]))
+        lines.append('{:<28} {:>10.4f} {:>10.3g} {:<8} {:>10.1f} {:>9}'.format(
+            key, result['seconds'], result['throughput'], result['unit'] + '/s', result['peak_mb'], ratio))
+    return '\n'.join(lines)
@@ -0,0 +1,27 @@
+# Fixtures shared by the tests.
+import os
+import numpy as np
+import pytest
+
+DATAFILE = os.path.join(os.path.dirname(__file__), '..', 'stock_data_5y.txt')
+
+
+@pytest.fixture(scope='session')
+def datafile():
+    '''
+    Path to the data file of the repository.
+    '''
+    return DATAFILE
+
+
+@pytest.fixture(scope='session')
+def _price_data(datafile):
+    return np.loadtxt(datafile, skiprows=1)
+
+
+@pytest.fixture
+def prices(_price_data):
+    '''
+    The price data of the data file (days x stocks), a copy each test may modify.
+    '''
+    return _price_data.copy()
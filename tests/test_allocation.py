@@ -0,0 +1,33 @@
+# Checks of the rebalancing to target weights.
+import numpy as np
+import trading.allocation as alloc
+import trading.costs as costs
+import trading.process as proc
+
+
+def test_rebalance_never_spends_more_than_the_cash(prices):
+    rng = np.random.default_rng(0)
+    for fees in (20, costs.CostModel(fixed=5, rate=0.002, minimum=10, spread=0.001)):
+        portfolio = proc.Portfolio(prices.shape[1], cash=50000)
+        for date in range(0, len(prices), 15):
+            # Weights that change a lot, so every rebalance both sells and buys
+            alloc.rebalance(portfolio, date, rng.random(prices.shape[1]) ** 4, prices, fees)
+            assert portfolio.cash >= 0
+            assert (portfolio.shares >= 0).all()
+    # Selling 1 share at 5 with fees of 20 would cost 15: the share is kept
+    portfolio = proc.Portfolio(2, cash=0)
+    portfolio.shares[0] = 1
+    with np.errstate(all='raise'):
+        alloc.rebalance(portfolio, 0, [0, 1], np.array([[5.0, 10.0]]), 20)
+    assert portfolio.cash == 0
+    assert portfolio.shares.tolist() == [1, 0]
+
+
+def test_rebalance_scales_purchases_down():
+    prices = np.array([[10.0, 20.0, 40.0]])
+    portfolio = proc.Portfolio(3, cash=1000)
+    # Targets of 25, 12 and 12 shares need 970 plus 60 of fees: every budget
+    # (270, 260 and 500) is scaled by 1000 / 1030
+    alloc.rebalance(portfolio, 0, [1, 1, 2], prices, 20)
+    assert portfolio.shares.tolist() == [24, 11, 11]
+    assert portfolio.cash == 1000 - (240 + 20) - (220 + 20) - (440 + 20)
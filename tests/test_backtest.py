@@ -0,0 +1,28 @@
+# Checks of the strategies run by name.
+import numpy as np
+import pytest
+import trading.backtest as bt
+import trading.indicators as indi
+import trading.montecarlo as mc
+import trading.multi as multi
+import trading.sweep as sw
+
+
+def test_strategy_signals_use_the_defaults(prices):
+    buy, sell = bt.strategy_signals('crossing_averages', prices, {})
+    expected = bt.crossing_signals(indi.moving_average(prices, 50), indi.moving_average(prices, 200))
+    np.testing.assert_array_equal(buy, expected[0])
+    np.testing.assert_array_equal(sell, expected[1])
+    with pytest.raises(ValueError):
+        bt.strategy_signals('momentum', prices, {'period': 7})
+    with pytest.raises(ValueError):
+        bt.strategy_signals('trend', prices, {})
+
+
+def test_runners_agree(prices):
+    params = {'n': 14, 'osc_type': 'RSI'}
+    equity, stats, shares, ledgers = multi.run_strategies({'rsi': ('momentum', params)}, prices)
+    results = sw.sweep('momentum', {name: [value] for name, value in params.items()}, prices, workers=0)
+    assert results['trades'][0] == stats['trades'][0] == len(ledgers['rsi'])
+    assert results['pnl'][0] == pytest.approx(equity[0, -1])
+    assert mc.run_paths({'rsi': ('momentum', params)}, 200, [100, 120], [1, 1], 2, seed=0)['rsi'][0].shape == (2,)
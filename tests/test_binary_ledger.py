@@ -0,0 +1,71 @@
+# Checks of the binary ledger files and their index.
+import os
+import numpy as np
+import trading.binary_ledger as binary
+import trading.process as proc
+
+
+def make_transactions(seed, count=200):
+    rng = np.random.default_rng(seed)
+    transactions = np.zeros(count, dtype=proc.TRANSACTION_DTYPE)
+    transactions['date'] = np.sort(rng.integers(0, 1825, count))
+    transactions['stock'] = rng.integers(0, 20, count)
+    transactions['shares'] = rng.integers(1, 100, count)
+    transactions['amount'] = rng.normal(0, 1000, count)
+    return transactions
+
+
+def test_index_rebuilt_when_ledger_recreated(tmp_path):
+    path = str(tmp_path / 'ledger.bin')
+    for seed in (0, 1):
+        # A new ledger with the same number of records, in place of the old one
+        binary.remove_ledger(path)
+        transactions = make_transactions(seed)
+        binary.append_records(path, transactions)
+        found = binary.LedgerIndex(path).query(7)
+        expected = transactions[transactions['stock'] == 7]
+        np.testing.assert_array_equal(found, expected)
+
+
+def test_index_rebuilt_when_ledger_rewritten_without_removing_index(tmp_path):
+    path = str(tmp_path / 'ledger.bin')
+    binary.append_records(path, make_transactions(0))
+    binary.LedgerIndex(path)
+    # Rewrite the ledger but leave the index behind
+    with open(path, 'wb'):
+        pass
+    transactions = make_transactions(1)
+    binary.append_records(path, transactions)
+    np.testing.assert_array_equal(binary.LedgerIndex(path).query(7), transactions[transactions['stock'] == 7])
+
+
+def test_index_rebuilt_when_ledger_rewritten_with_same_size_and_time(tmp_path):
+    # A coarse file system clock: the rewritten ledger keeps the modification time
+    path = str(tmp_path / 'ledger.bin')
+    binary.append_records(path, make_transactions(0))
+    binary.LedgerIndex(path)
+    mtime = os.stat(path).st_mtime_ns
+    with open(path, 'wb'):
+        pass
+    transactions = make_transactions(1)
+    binary.append_records(path, transactions)
+    os.utime(path, ns=(mtime, mtime))
+    np.testing.assert_array_equal(binary.LedgerIndex(path).query(7), transactions[transactions['stock'] == 7])
+
+
+def test_text_binary_round_trip(tmp_path):
+    text_file, binary_file, back = (str(tmp_path / name) for name in ('ledger.txt', 'ledger.bin', 'back.txt'))
+    transactions = make_transactions(2)
+    transactions['type'][::3] = 1
+    with proc.Ledger(text_file, capacity=16) as ledger:
+        for row in transactions.tolist():
+            ledger.record(proc.TRANSACTION_TYPES[row[0]], *row[1:])
+    binary.text_to_binary(text_file, binary_file)
+    converted = binary.read_binary(binary_file)
+    for field in ('type', 'date', 'stock', 'shares', 'amount'):
+        np.testing.assert_array_equal(converted[field], transactions[field])
+    # Text ledgers do not keep the fees
+    assert np.isnan(converted['fees']).all()
+    binary.binary_to_text(binary_file, back)
+    with open(text_file) as original, open(back) as converted_back:
+        assert converted_back.read() == original.read()
@@ -0,0 +1,50 @@
+# Checks of the indicator cache.
+import numpy as np
+import trading.cache as cache
+import trading.indicators as indi
+
+
+def test_memory_stays_under_max_bytes(prices):
+    prices = prices[:100]
+    # Room for the moving averages of 3 stocks (100 floats each)
+    indicators = cache.IndicatorCache(max_bytes=3 * 800)
+    for stock in range(4):
+        ma = indicators.moving_average(prices[:, stock], 10)
+        np.testing.assert_array_equal(ma, indi.moving_average(prices[:, stock], 10))
+        assert indicators.nbytes <= indicators.max_bytes
+    assert indicators.stats()['entries'] == 3
+    # Stock 0 was the least recently used and has been evicted
+    indicators.moving_average(prices[:, 1], 10)
+    assert (indicators.hits, indicators.misses) == (1, 4)
+    indicators.moving_average(prices[:, 0], 10)
+    assert (indicators.hits, indicators.misses) == (1, 5)
+    # Stock 1 was used again, so stock 2 made room for stock 0
+    indicators.moving_average(prices[:, 1], 10)
+    indicators.moving_average(prices[:, 2], 10)
+    assert (indicators.hits, indicators.misses) == (2, 6)
+    assert indicators.nbytes == sum(result.nbytes for result in indicators.entries.values()) <= 3 * 800
+
+
+def test_result_larger_than_max_bytes_is_not_kept(tmp_path, prices):
+    prices = prices[:100]
+    indicators = cache.IndicatorCache(max_bytes=500, cache_dir=str(tmp_path))
+    indicators.moving_average(prices[:, 0], 10)
+    assert indicators.stats()['entries'] == 0 and indicators.nbytes == 0
+    # It is still found on disk
+    indicators.moving_average(prices[:, 0], 10)
+    assert indicators.disk_hits == 1
+
+
+def test_clear_disk_keeps_other_files(tmp_path, prices):
+    indicators = cache.IndicatorCache(cache_dir=str(tmp_path))
+    indicators.moving_average(prices[:100], 10)
+    (tmp_path / 'notes.npy').write_bytes(b'')
+    assert len(list(tmp_path.iterdir())) == prices.shape[1] + 1
+    indicators.clear_disk()
+    assert [path.name for path in tmp_path.iterdir()] == ['notes.npy']
+    # The memory part is kept, a new cache on the same folder computes again
+    indicators.moving_average(prices[:100], 10)
+    assert indicators.misses == prices.shape[1]
+    other = cache.IndicatorCache(cache_dir=str(tmp_path))
+    other.moving_average(prices[:100], 10)
+    assert (other.disk_hits, other.misses) == (0, prices.shape[1])
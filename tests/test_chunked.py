@@ -0,0 +1,26 @@
+# Checks of the backtest run a block of days at a time.
+import numpy as np
+import trading.backtest as bt
+import trading.chunked as chunked
+import trading.process as proc
+
+STRATEGIES = [('crossing_averages', {}), ('crossing_averages', {'n': 30, 'm': 5}), ('momentum', {}),
+              ('momentum', {'n': 14, 'osc_type': 'RSI'}), ('momentum', {'cooldown': 0})]
+
+
+def test_blocks_give_the_in_memory_trades(tmp_path, prices, datafile):
+    npyfile = str(tmp_path / 'prices.npy')
+    np.save(npyfile, prices)
+    for strategy_name, params in STRATEGIES:
+        buy, sell = bt.strategy_signals(strategy_name, prices, params)
+        expected = proc.Portfolio(prices.shape[1])
+        ledger = proc.Ledger()
+        bt.run_signals(buy, sell, prices, 5000, 20, expected, ledger)
+        # 1825 days: 7 and 250 do not divide it, the last block is shorter
+        for source, block_size in ((npyfile, 1), (datafile, 1), (npyfile, 7), (datafile, 250), (npyfile, 2000)):
+            blocks = chunked.iter_blocks(source, block_size)
+            streamed = proc.Ledger()
+            portfolio = chunked.stream_backtest(blocks, strategy_name, params, streamed)
+            np.testing.assert_array_equal(streamed.to_array(), ledger.to_array())
+            np.testing.assert_array_equal(portfolio.shares, expected.shares)
+            assert portfolio.cash == expected.cash
@@ -0,0 +1,40 @@
+# Checks of the transaction cost models.
+import numpy as np
+import trading.costs as costs
+
+
+def spent(model, number, prices):
+    return number * prices + model.fees(number * prices)
+
+
+def test_affordable_spends_at_most_the_capital():
+    rng = np.random.default_rng(0)
+    prices = np.round(rng.uniform(1, 500, 10000), 2)
+    capital = np.round(rng.uniform(0, 20000, 10000), 2)
+    for model in (costs.CostModel(fixed=20), costs.CostModel(rate=0.001, minimum=5),
+                  costs.CostModel(fixed=1, rate=0.01, minimum=2, spread=0.001, slippage=0.0005)):
+        buy_prices = model.buy_prices(prices)
+        number = model.affordable(capital, buy_prices)
+        bought = number > 0
+        assert (spent(model, number[bought], buy_prices[bought]) <= capital[bought]).all()
+        # One more share would cost more than the capital. When it costs exactly the
+        # capital, the floor division may round down as process.buy() always did
+        more = spent(model, number + 1, buy_prices)
+        assert ((more > capital) | np.isclose(more, capital, rtol=0, atol=1e-6)).all()
+
+
+def test_affordable_with_minimum_fees():
+    # The proportional fees (0.1% of 1000 = 1) are below the minimum (5)
+    model = costs.CostModel(rate=0.001, minimum=5)
+    assert model.affordable(1005, 100.0) == 10
+    assert model.affordable(1004.99, 100.0) == 9
+    # Above the minimum, the fees grow with the shares: 100 shares cost 10000 + 10
+    assert model.affordable(10010, 100.0) == 100
+    assert model.affordable(10009.99, 100.0) == 99
+
+
+def test_affordable_without_enough_for_the_fees():
+    # 10 does not cover fees of 20: no share, never a negative number
+    assert costs.CostModel(fixed=20).affordable(10, 5.0) == 0
+    model = costs.CostModel(fixed=1, rate=0.01, minimum=5)
+    np.testing.assert_array_equal(model.affordable(np.array([0, 3, 6, 106]), 100.0), [0, 0, 0, 1])
@@ -0,0 +1,34 @@
+# Checks of the binary cache of the data file.
+import os
+import shutil
+import numpy as np
+import trading.data as data
+import trading.files as files
+
+
+def test_load_data_uses_the_cache(tmp_path, datafile):
+    copied = str(tmp_path / 'stock_data_5y.txt')
+    shutil.copy(datafile, copied)
+    datafile = copied
+    prices, volatility, initial_price = data.load_data(datafile)
+    assert all(os.path.exists(path) for path in data.cache_paths(datafile))
+    expected = np.loadtxt(datafile)
+    np.testing.assert_array_equal(prices, expected[1:])
+    np.testing.assert_array_equal(volatility, expected[0])
+    np.testing.assert_array_equal(initial_price, expected[1])
+
+
+def test_load_data_without_a_writable_cache(tmp_path, monkeypatch, datafile):
+    copied = str(tmp_path / 'stock_data_5y.txt')
+    shutil.copy(datafile, copied)
+    datafile = copied
+
+    def read_only(path, write):
+        raise PermissionError(13, 'Permission denied', path)
+    monkeypatch.setattr(files, 'replace_file', read_only)
+    prices, volatility, initial_price = data.load_data(datafile)
+    assert os.listdir(str(tmp_path)) == ['stock_data_5y.txt']
+    expected = np.loadtxt(datafile)
+    np.testing.assert_array_equal(prices, expected[1:])
+    np.testing.assert_array_equal(volatility, expected[0])
+    assert data.get_data('read', datafile=datafile).shape == (1825, 20)
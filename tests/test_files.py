@@ -0,0 +1,19 @@
+# Checks of the atomic file writes.
+import os
+import pytest
+import trading.files as files
+
+
+def test_failed_write_keeps_the_old_file(tmp_path):
+    path = str(tmp_path / 'prices.npy')
+    files.replace_file(path, lambda f: f.write(b'old'))
+
+    def fail(f):
+        f.write(b'partial')
+        raise OSError('disk full')
+    with pytest.raises(OSError):
+        files.replace_file(path, fail)
+    with open(path, 'rb') as f:
+        assert f.read() == b'old'
+    # No temporary file is left behind
+    assert os.listdir(str(tmp_path)) == ['prices.npy']
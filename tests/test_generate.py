@@ -0,0 +1,58 @@
+# Checks of the batched price generator.
+import numpy as np
+import trading.data as data
+
+
+def loop_paths(days, initial_price, volatility, n_paths, seed):
+    '''
+    The model of generate_stock_price() written day by day, with the random
+    numbers drawn in the same order as generate_stock_paths().
+    '''
+    n_stocks = len(initial_price)
+    rng = np.random.default_rng(seed)
+    inc = rng.normal(0, 1, (days, n_stocks, n_paths))
+    news_today = rng.random((days - 1, n_stocks, n_paths)) < 0.01
+    news = list(zip(*np.nonzero(news_today)))
+    drift = rng.normal(0, 4, len(news))
+    duration = rng.integers(3, 14, len(news))
+    total_drift = np.zeros((days, n_stocks, n_paths))
+    for (day, stock, path), m, length in zip(news, drift, duration):
+        # News on day+1 moves the price for length days, until the end of the data at most
+        total_drift[day + 1:day + 1 + length, stock, path] += m * volatility[stock]
+    prices = np.zeros((days, n_stocks, n_paths))
+    prices[0] = np.reshape(initial_price, (-1, 1))
+    for day in range(1, days):
+        for stock in range(n_stocks):
+            prices[day, stock] = (prices[day - 1, stock] + inc[day, stock] * volatility[stock]**2
+                                  + total_drift[day, stock])
+    return prices
+
+
+def test_paths_follow_the_model():
+    paths = data.generate_stock_paths(400, [100, 20, 300], [1, 2, 0.5], n_paths=4, seed=3)
+    assert paths.shape == (400, 3, 4)
+    np.testing.assert_array_equal(paths, data.generate_stock_paths(400, [100, 20, 300], [1, 2, 0.5], 4, seed=3))
+    assert not np.array_equal(paths, data.generate_stock_paths(400, [100, 20, 300], [1, 2, 0.5], 4, seed=4))
+    expected = loop_paths(400, [100, 20, 300], [1, 2, 0.5], 4, 3)
+    alive = ~np.isnan(paths)
+    np.testing.assert_allclose(paths[alive], expected[alive], rtol=1e-9)
+    # The stock of 20 with volatility 2 goes below zero on some paths: NaN from then on
+    gone = ~np.logical_and.accumulate(expected > 0, axis=0)
+    assert gone.any()
+    np.testing.assert_array_equal(~alive, gone)
+    # News drift is proportional to the volatility too: without volatility nothing moves
+    np.testing.assert_array_equal(data.generate_stock_paths(100, [50], [0], 3, seed=1), 50)
+
+
+def test_generate_messages(capsys):
+    assert data.get_data('generate', initial_price=[150, 200]) is None
+    assert capsys.readouterr().out == 'Please specify the volatility for each stock.\n'
+    assert data.get_data('generate', volatility=[3]) is None
+    assert capsys.readouterr().out == 'Please specify the initial price for each stock.\n'
+    assert data.get_data('generate', initial_price=[150, 200], volatility=[3]) is None
+    assert capsys.readouterr().out == 'Please specify the volatility for each stock.\n'
+    assert data.get_data('generate', initial_price=[150], volatility=[3, 1]) is None
+    assert capsys.readouterr().out == 'Please specify the initial price for each stock.\n'
+    sim_data = data.get_data('generate', initial_price=[150, 250], volatility=[1.8, 3.2], seed=1)
+    assert sim_data.shape == (1825, 2)
+    assert capsys.readouterr().out == ''
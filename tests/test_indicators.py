@@ -0,0 +1,119 @@
+# Checks of the vectorised indicators against exact computations.
+from fractions import Fraction
+import numpy as np
+import pytest
+import trading.chunked as chunked
+import trading.indicators as indi
+import trading.streaming as streaming
+
+
+def exact_averages(stock_price, n):
+    '''
+    The n-day moving averages as fractions, from the prices in cents. None when
+    the window has a NaN.
+    '''
+    cents = [None if np.isnan(price) else round(price * 100) for price in stock_price]
+    averages = [None] * len(cents)
+    for index in range(n - 1, len(cents)):
+        window = cents[index - n + 1:index + 1]
+        if None not in window:
+            averages[index] = Fraction(sum(window), 100 * n)
+    return averages
+
+
+def exact_crossings(fast, slow):
+    '''
+    Days of the crossings of exact averages, compared as the original
+    crossing_averages() did: equal averages are a tie, not a crossing.
+    '''
+    def below(a, b):
+        return a is not None and b is not None and a < b
+    buy = [i for i in range(1, len(fast) - 1) if below(fast[i - 1], slow[i - 1]) and below(slow[i + 1], fast[i + 1])]
+    sell = [i for i in range(1, len(fast) - 1) if below(slow[i - 1], fast[i - 1]) and below(fast[i + 1], slow[i + 1])]
+    return buy, sell
+
+
+def test_moving_average_is_exact(prices):
+    for n in (5, 7, 10, 20, 30, 50, 100, 200):
+        ma = indi.moving_average(prices, n)
+        for stock in range(prices.shape[1]):
+            expected = [np.nan if a is None else float(a) for a in exact_averages(prices[:, stock], n)]
+            np.testing.assert_array_equal(ma[:, stock], expected)
+
+
+def test_equal_windows_give_equal_averages():
+    # 1.10 + 2.20 and 1.30 + 2.00 differ with floating point additions
+    ma = indi.moving_average([1.10, 2.20, 1.30, 2.00], 2)
+    assert ma[1] == ma[3]
+
+
+def test_values_too_large_to_sum():
+    # 2e11 in units of 1e-8 does not fit in an int64, it must not silently become 0
+    with pytest.raises(ValueError):
+        indi.moving_average([2e11] * 3, 2)
+    with pytest.raises(ValueError):
+        streaming.MovingAverage(200).update(np.array([1e9]))
+    # Values with more than 8 decimals are rounded to 1e-8 before the sum
+    values = np.random.default_rng(0).uniform(50, 150, 500)
+    np.testing.assert_allclose(indi.moving_average(values, 20)[19:],
+                               np.convolve(values, np.ones(20) / 20, 'valid'), rtol=0, atol=5e-9)
+
+
+def test_crossings_match_exact_averages(prices):
+    # Prices have two decimals, so the averages are sometimes exactly equal:
+    # those ties must not be turned into crossings by rounding, nor the reverse
+    for m in (5, 7, 10, 20, 50):
+        for n in (30, 100, 200):
+            fast = indi.moving_average(prices, m)
+            slow = indi.moving_average(prices, n)
+            for stock in range(prices.shape[1]):
+                expected = exact_crossings(exact_averages(prices[:, stock], m), exact_averages(prices[:, stock], n))
+                buy = (fast[:-2, stock] < slow[:-2, stock]) & (fast[2:, stock] > slow[2:, stock])
+                sell = (fast[:-2, stock] > slow[:-2, stock]) & (fast[2:, stock] < slow[2:, stock])
+                assert (list(np.nonzero(buy)[0] + 1), list(np.nonzero(sell)[0] + 1)) == expected
+
+
+def test_streaming_and_blocks_match_batch(prices):
+    prices = prices[:400]
+    prices[100:105, 3] = np.nan
+    for n in (1, 7, 30):
+        batch = indi.moving_average(prices, n)
+        ma = streaming.MovingAverage(n)
+        np.testing.assert_array_equal(np.array([ma.update(row) for row in prices]), batch)
+        for block_size in (1, 7, 64):
+            ma = chunked.BlockMovingAverage(n)
+            blocks = [ma.update(block) for block in chunked.iter_blocks(prices, block_size)]
+            np.testing.assert_array_equal(np.concatenate(blocks), batch)
+    for n in (2, 7, 14):
+        batch = indi.oscillator(prices, n, 'RSI')
+        rsi = streaming.RSI(n)
+        np.testing.assert_array_equal(np.array([rsi.update(row) for row in prices]), batch)
+        for block_size in (1, 7, 64):
+            rsi = chunked.BlockOscillator(n, 'RSI')
+            blocks = [rsi.update(block) for block in chunked.iter_blocks(prices, block_size)]
+            np.testing.assert_array_equal(np.concatenate(blocks), batch)
+
+
+def window_rsi(window):
+    '''
+    RSI of one n-day window, from its own price differences only.
+    '''
+    delta = np.diff(window)
+    # A missing price counts as a fall, as in the original loop
+    up, down = delta[delta > 0], -delta[~(delta > 0)]
+    if len(down) == 0:
+        return 1
+    if len(up) == 0:
+        return 0
+    return up.mean() / (up.mean() + down.mean())
+
+
+def test_rsi_windows_are_independent(prices):
+    # [1, 2, 4] only rises (RSI 1); [2, 4, 3] rises by 2 and falls by 1. The original
+    # loop kept the rises of the first window and gave 5/8 instead of 2/3
+    np.testing.assert_allclose(indi.oscillator([1.0, 2.0, 4.0, 3.0], 3, 'RSI'), [0, 0, 1, 2 / 3])
+    for n in (3, 5, 7, 14):
+        rsi = indi.oscillator(prices, n, 'RSI')
+        for stock in range(prices.shape[1]):
+            expected = [window_rsi(prices[i - n + 1:i + 1, stock]) for i in range(n - 1, len(prices))]
+            np.testing.assert_allclose(rsi[n - 1:, stock], expected, rtol=1e-9)
@@ -0,0 +1,40 @@
+# Checks of the opt-in instrumentation.
+import numpy as np
+import trading.binary_ledger as binary
+import trading.instrument as instrument
+
+
+def names():
+    return [row['name'] for row in instrument.summary()]
+
+
+def test_profile_keeps_calls_recorded_before(capsys):
+    instrument.enable()
+    try:
+        instrument.reset()
+        with instrument.timer('before'):
+            pass
+        with instrument.profile('block'):
+            pass
+        assert 'before' in names() and 'block' in names()
+    finally:
+        instrument.disable()
+        instrument.reset()
+    # Without the instrumentation on, a profile starts from nothing
+    with instrument.timer('ignored'):
+        pass
+    with instrument.profile('alone'):
+        pass
+    assert names() == ['alone']
+    instrument.reset()
+    assert 'alone' in capsys.readouterr().out
+
+
+def test_binary_ledger_writes_are_timed(tmp_path, capsys):
+    with instrument.profile('write'):
+        with binary.BinaryLedger(str(tmp_path / 'ledger.bin')) as ledger:
+            ledger.record_many('buy', 1, np.arange(3), np.ones(3), -np.ones(3), np.zeros(3))
+    rows = {row['name']: row for row in instrument.summary()}
+    instrument.reset()
+    assert rows['binary_ledger.BinaryLedger.flush']['stage'] == 'ledger'
+    assert not instrument.is_enabled()
@@ -0,0 +1,36 @@
+# Checks of the buffered Ledger writing to a file.
+import numpy as np
+import trading.performance as perf
+import trading.process as proc
+
+TRANSACTIONS = [('buy', 0, 1, 10, -1020.5), ('buy', 0, 3, 4, -420), ('sell', 2, 1, 10, 1100.25),
+                ('buy', 3, 0, 7, -720), ('sell', 5, 3, 4, 380), ('buy', 5, 2, 1, -35.75)]
+
+
+def read_lines(path):
+    with open(path) as f:
+        return f.read().splitlines()
+
+
+def test_ledger_file_is_written_in_batches(tmp_path):
+    path = str(tmp_path / 'ledger.txt')
+    with proc.Ledger(path, capacity=4) as ledger:
+        for transaction in TRANSACTIONS[:4]:
+            ledger.record(*transaction, 20)
+        # The buffer is full but not written yet
+        assert not (tmp_path / 'ledger.txt').exists()
+        ledger.record(*TRANSACTIONS[4], 20)
+        assert read_lines(path) == ['buy,0,1,10.0,-1020.5', 'buy,0,3,4.0,-420.0', 'sell,2,1,10.0,1100.25',
+                                    'buy,3,0,7.0,-720.0']
+        ledger.record_many('buy', 5, [2], [1], [-35.75], 20)
+    # Leaving the with block writes the rest
+    assert len(read_lines(path)) == 6
+    assert len(ledger) == 6
+    transactions = perf.read_transactions(path)
+    assert [(proc.TRANSACTION_TYPES[row['type']], row['date'], row['stock'], row['shares'], row['amount'])
+            for row in transactions] == TRANSACTIONS
+    cash = perf.read_ledger(7, path)
+    amounts = np.zeros(7)
+    for transaction in TRANSACTIONS:
+        amounts[transaction[1]] += transaction[4]
+    np.testing.assert_allclose(cash, np.cumsum(amounts))
@@ -0,0 +1,77 @@
+# Checks of the asyncio feed and order execution loop.
+import asyncio
+import gc
+import numpy as np
+import pytest
+import trading.backtest as bt
+import trading.live as live
+import trading.process as proc
+
+
+def shifted_ledger(strategy_name, params, prices, lag):
+    '''
+    Transactions of the batch strategy, each made lag days later at that day's prices.
+    '''
+    buy, sell = bt.strategy_signals(strategy_name, prices, params)
+    late_buy = np.zeros(buy.shape, dtype=bool)
+    late_sell = np.zeros(sell.shape, dtype=bool)
+    late_buy[lag:] = buy[:-lag]
+    late_sell[lag:] = sell[:-lag]
+    ledger = proc.Ledger()
+    bt.run_signals(late_buy, late_sell, prices, 5000, 20, proc.Portfolio(prices.shape[1]), ledger)
+    return ledger.to_array()
+
+
+def test_live_trades_are_the_batch_trades_once_known(prices):
+    strategies = {'crossing': ('crossing_averages', {'n': 100, 'm': 20}),
+                  'stochastic': ('momentum', {}), 'rsi': ('momentum', {'n': 14, 'osc_type': 'RSI'}),
+                  'no_cooldown': ('momentum', {'cooldown': 0})}
+    portfolios, ledgers, latency = asyncio.run(live.run_live(prices, strategies, queue_size=4, batch_size=8))
+    # A crossing is known 2 days after the batch transaction, an oscillator signal 1 day after
+    for name, lag in (('crossing', 2), ('stochastic', 1), ('rsi', 1), ('no_cooldown', 1)):
+        np.testing.assert_array_equal(ledgers[name].to_array(), shifted_ledger(*strategies[name], prices, lag))
+    # The cooldown parameter is used, not a fixed 5 days
+    assert len(ledgers['no_cooldown']) > len(ledgers['stochastic'])
+    assert latency['orders'] > 0
+    assert latency['p50'] <= latency['p90'] <= latency['p99'] <= latency['p100']
+
+
+def test_feed_waits_for_the_slowest_subscriber():
+    async def run():
+        feed = live.SimulatedFeed(np.arange(20.0).reshape(10, 2))
+        fast, slow = feed.subscribe(100), feed.subscribe(2)
+        publishing = asyncio.ensure_future(feed.run())
+        for _ in range(10):
+            await asyncio.sleep(0)
+        # The feed stops when the slow queue is full, the fast one is not ahead either
+        assert not publishing.done()
+        assert slow.qsize() == 2 and fast.qsize() == 3
+        days = []
+        while True:
+            tick = await slow.get()
+            if tick is None:
+                break
+            days.append(tick.day)
+        await publishing
+        return days
+    assert asyncio.run(run()) == list(range(10))
+
+
+def test_executor_failure_stops_the_loop(prices):
+    # Every order fails to fill: run_live raises instead of waiting on the full queues
+    with pytest.raises(TypeError):
+        asyncio.run(live.run_live(prices, {'m': ('momentum', {})}, fees='x', queue_size=2, batch_size=1))
+
+
+def test_unknown_strategy_is_found_before_the_loop_starts(prices, recwarn):
+    with pytest.raises(ValueError, match='random'):
+        asyncio.run(live.run_live(prices, {'m': ('momentum', {}), 'r': ('random', {})}))
+    gc.collect()
+    # No coroutine of the valid strategy was created, and left never awaited
+    assert not [w for w in recwarn if 'never awaited' in str(w.message)]
+
+
+def test_latency_percentiles():
+    stats = live.latency_percentiles([1e6 * k for k in range(1, 101)], (50, 100))
+    assert stats == {'orders': 100, 'p50': pytest.approx(50.5), 'p100': 100}
+    assert live.latency_percentiles([]) == {'orders': 0}
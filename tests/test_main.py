@@ -0,0 +1,63 @@
+# Checks of the command line interface.
+import json
+import os
+import subprocess
+import sys
+import numpy as np
+import pytest
+import trading.__main__ as cli
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+
+
+def write_config(tmp_path, config):
+    path = str(tmp_path / 'config.json')
+    with open(path, 'w') as f:
+        json.dump(config, f)
+    return path
+
+
+def test_config_sections_keep_their_defaults(tmp_path):
+    config = cli.read_config(write_config(tmp_path, {'generate': {'n_paths': 3}, 'fees': 5}))
+    assert config['generate'] == dict(cli.DEFAULT_CONFIG['generate'], n_paths=3)
+    assert config['sweep'] == cli.DEFAULT_CONFIG['sweep']
+    assert config['fees'] == 5
+    with pytest.raises(ValueError, match='fast'):
+        cli.read_config(write_config(tmp_path, {'strategies': {'fast': {'n': 50, 'm': 10}}}))
+
+
+def test_generate_backtest_and_report(tmp_path, capsys):
+    output = str(tmp_path / 'results')
+    config = write_config(tmp_path, {'generate': {'days': 300, 'initial_price': [100, 50], 'volatility': [1, 2],
+                                                  'seed': 0},
+                                     'strategies': {'fast': {'strategy': 'crossing_averages', 'n': 30, 'm': 5}}})
+    assert cli.main(['generate', '--config', config, '--output', output]) == 0
+    prices = np.load(os.path.join(output, 'prices.npy'))
+    assert prices.shape == (300, 2)
+    assert cli.main(['backtest', '--config', config, '--output', output,
+                     '--data', os.path.join(output, 'prices.npy')]) == 0
+    stats = np.load(os.path.join(output, 'stats.npy'))
+    assert len(stats) == 1
+    capsys.readouterr()
+    assert cli.main(['report', os.path.join(output, 'stats.npy')]) == 0
+    assert 'max_drawdown' in capsys.readouterr().out
+
+
+def test_report_of_a_sweep_without_seed(tmp_path, capsys, datafile):
+    # The seed None of the grid is saved as NaN, the file is read without pickle
+    config = write_config(tmp_path, {'data': datafile, 'output': str(tmp_path),
+                                     'sweep': {'strategy': 'random', 'grid': {'period': [7, 30], 'seed': [None]},
+                                               'workers': 0}})
+    assert cli.main(['sweep', '--config', config]) == 0
+    results = np.load(str(tmp_path / 'sweep.npy'))
+    assert results['period'].tolist() == [7, 30] and np.isnan(results['seed']).all()
+    capsys.readouterr()
+    assert cli.main(['report', str(tmp_path / 'sweep.npy')]) == 0
+    assert 'nan' in capsys.readouterr().out
+
+
+def test_startup_does_not_load_numpy():
+    code = 'import sys, trading, trading.__main__; print("numpy" in sys.modules)'
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, stdout=subprocess.PIPE,
+                            universal_newlines=True, check=True)
+    assert result.stdout.strip() == 'False'
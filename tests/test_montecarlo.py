@@ -0,0 +1,36 @@
+# Checks of the Monte Carlo evaluation over simulated paths.
+import numpy as np
+import pytest
+import trading.data as data
+import trading.montecarlo as mc
+import trading.sweep as sw
+
+STRATEGIES = {'slow': ('crossing_averages', {'n': 30, 'm': 5}), 'fast': ('crossing_averages', {'n': 10, 'm': 3}),
+              'osc': ('momentum', {'n': 7})}
+
+
+def test_paths_are_run_one_by_one():
+    results = mc.run_paths(STRATEGIES, 300, [100, 50], [1, 2], 3, seed=4)
+    # Same prices as run_paths() generates from its seed
+    price_seed = np.random.SeedSequence(4).spawn(2)[0]
+    paths = data.generate_stock_paths(300, [100, 50], [1, 2], 3, price_seed)
+    for name, (strategy_name, params) in STRATEGIES.items():
+        pnl, drawdown = results[name]
+        for path in range(3):
+            row = sw.run_config(strategy_name, params, paths[:, :, path], 5000, 20)
+            assert pnl[path] == pytest.approx(row[0])
+            assert drawdown[path] == pytest.approx(row[2])
+
+
+def test_monte_carlo_chunks():
+    results = mc.monte_carlo(STRATEGIES, 5, [100, 50], [1, 2], days=300, chunk=2, seed=4)
+    # Each chunk of paths has its own seed
+    seeds = np.random.SeedSequence(4).spawn(3)
+    chunks = [mc.run_paths(STRATEGIES, 300, [100, 50], [1, 2], size, chunk_seed)
+              for size, chunk_seed in zip((2, 2, 1), seeds)]
+    for name in STRATEGIES:
+        np.testing.assert_array_equal(results[name]['pnl'], np.concatenate([chunk[name][0] for chunk in chunks]))
+        np.testing.assert_array_equal(results[name]['max_drawdown_amount'],
+                                      np.concatenate([chunk[name][1] for chunk in chunks]))
+        np.testing.assert_array_equal(results[name]['pnl_quantiles'],
+                                      np.quantile(results[name]['pnl'], (0.05, 0.25, 0.5, 0.75, 0.95)))
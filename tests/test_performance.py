@@ -0,0 +1,41 @@
+# Checks of the statistics computed from ledgers.
+import numpy as np
+import pytest
+import trading.performance as perf
+import trading.process as proc
+
+
+def make_ledger(transactions):
+    ledger = proc.Ledger()
+    for transaction in transactions:
+        ledger.record(*transaction, 0)
+    return ledger
+
+
+def test_win_rate_round_trips():
+    # Transactions of several stocks mixed together, as a strategy writes them
+    ledger = make_ledger([('buy', 1, 0, 2, -100), ('buy', 2, 0, 1, -50), ('buy', 3, 1, 4, -200),
+                          ('sell', 4, 1, 4, 200), ('sell', 5, 0, 3, 170), ('buy', 6, 0, 1, -100),
+                          ('buy', 7, 2, 1, -10), ('sell', 8, 0, 1, 90)])
+    # Stock 0 wins once (170 for 150) and loses once (90 for 100), stock 1 breaks
+    # even (not a win), stock 2 is never sold
+    assert perf.win_rate(ledger) == pytest.approx(1 / 3)
+    assert np.isnan(perf.win_rate(make_ledger([('buy', 1, 0, 2, -100)])))
+
+
+def test_curve_stats():
+    ledger = make_ledger([('buy', 0, 0, 1, -100), ('sell', 3, 0, 1, 120)])
+    equity = np.array([0, 10, -5, 20])
+    stats = perf.curve_stats(equity, ledger)
+    # The initial capital is the most cash ever spent: the account goes 100, 110, 95, 120
+    returns = np.array([10 / 100, -15 / 110, 25 / 95])
+    assert stats['trades'] == 2
+    assert stats['pnl'] == 20
+    assert stats['total_return'] == pytest.approx(0.2)
+    assert stats['max_drawdown'] == pytest.approx(15 / 110)
+    assert stats['sharpe'] == pytest.approx(returns.mean() / returns.std() * np.sqrt(365))
+    assert perf.curve_stats(equity, ledger, periods_per_year=252)['sharpe'] == pytest.approx(
+        returns.mean() / returns.std() * np.sqrt(252))
+    assert stats['turnover'] == pytest.approx(220 / 100)
+    assert stats['win_rate'] == 1
+    assert perf.curve_stats(equity, ledger, initial_capital=1000)['total_return'] == pytest.approx(0.02)
@@ -0,0 +1,69 @@
+# Checks of the money arithmetic of Portfolio.
+import numpy as np
+import pytest
+import trading.costs as costs
+import trading.process as proc
+
+PRICES = np.array([[10.0, 20.0, np.nan],
+                   [12.0, 25.0, 5.0],
+                   [15.0, 30.0, 6.0]])
+
+
+def test_buy_many_average_cost():
+    portfolio = proc.Portfolio(3)
+    ledger = proc.Ledger()
+    # 98 left after the fees: 9 shares at 10, 4 shares at 20, no price for stock 2
+    portfolio.buy_many(0, [0, 1, 2], 100, PRICES, 2, ledger)
+    assert portfolio.shares.tolist() == [9, 4, 0]
+    assert portfolio.avg_cost.tolist() == [92 / 9, 82 / 4, 0]
+    # 8 more shares at 12: the average cost includes both purchases and their fees
+    portfolio.buy_many(1, [0], 100, PRICES, 2, ledger)
+    assert portfolio.shares[0] == 17
+    assert portfolio.avg_cost[0] == pytest.approx((92 + 98) / 17)
+    assert portfolio.cash == pytest.approx(-(92 + 82 + 98))
+    assert ledger.to_array()['amount'].tolist() == [-92, -82, -98]
+
+    # 10 does not cover the fees: nothing is bought, no cash is spent or earned
+    portfolio = proc.Portfolio(3, cash=10)
+    portfolio.buy_many(1, [0, 1], 10, PRICES, 20, ledger)
+    assert portfolio.shares.tolist() == [0, 0, 0]
+    assert portfolio.cash == 10
+    assert len(ledger) == 3
+
+
+def test_sell_many_realized_pnl():
+    portfolio = proc.Portfolio(3, cash=1000)
+    portfolio.buy_many(0, [0, 1], 100, PRICES, 2)
+    portfolio.buy_many(1, [0], 100, PRICES, 2)
+    avg_cost = portfolio.avg_cost[0]
+    ledger = proc.Ledger()
+    # Part of stock 0 at 15, all of stock 1 at 30, nothing of stock 2 (no shares)
+    portfolio.sell_many(2, [0, 1, 2], PRICES, 2, ledger, numbers=[5, 10, 1])
+    assert portfolio.shares.tolist() == [12, 0, 0]
+    assert portfolio.realized[0] == pytest.approx(5 * 15 - 2 - 5 * avg_cost)
+    assert portfolio.realized[1] == pytest.approx(4 * 30 - 2 - 82)
+    # The shares still held keep their average cost, a closed position has none
+    assert portfolio.avg_cost.tolist() == [avg_cost, 0, 0]
+    assert portfolio.cash == pytest.approx(1000 - 92 - 82 - 98 + 73 + 118)
+    assert ledger.to_array()['shares'].tolist() == [5, 4]
+    # Cash is what was paid and received, the realized P&L only the part of it already earned
+    value = portfolio.cash + portfolio.shares[0] * avg_cost
+    assert value == pytest.approx(1000 + portfolio.realized.sum())
+
+
+def test_fills_of_several_strategies_match_portfolio():
+    model = costs.CostModel(fixed=1, rate=0.01, minimum=2, spread=0.02)
+    to_buy = np.array([[True, True, False], [False, True, False]])
+    capital = np.array([[100.0], [300.0]])
+    number, total, fees = proc.buy_fills(to_buy, capital, PRICES[1], model)
+    sold = np.array([[3, 0, 0], [0, 2, 0]])
+    earned, sell_fees = proc.sell_fills(sold, PRICES[2], model)
+    for k in range(2):
+        portfolio = proc.Portfolio(3, cash=0)
+        ledger = proc.Ledger()
+        portfolio.buy_many(1, np.nonzero(to_buy[k])[0], capital[k], PRICES, model, ledger)
+        portfolio.sell_many(2, [0, 1, 2], PRICES, model, ledger, numbers=sold[k])
+        assert portfolio.cash == pytest.approx(total[k].sum() + earned[k].sum())
+        transactions = ledger.to_array()
+        np.testing.assert_array_equal(transactions['shares'], np.concatenate([number[k][to_buy[k]], sold[k][sold[k] > 0]]))
+        np.testing.assert_array_equal(transactions['fees'], np.concatenate([fees[k][to_buy[k]], sell_fees[k][sold[k] > 0]]))
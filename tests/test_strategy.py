@@ -0,0 +1,79 @@
+# Checks of the strategies against the loops of the original functions.
+import numpy as np
+import trading.indicators as indi
+import trading.process as proc
+import trading.strategy as strategy
+
+
+def loop_trades(buy_point, sell_point, stock, stock_prices, portfolio, ledger):
+    # Trade the day before each point, one day at a time
+    for day in range(len(stock_prices)):
+        if day+1 in buy_point:
+            proc.buy(day, stock, 5000, stock_prices, 20, portfolio, ledger)
+        elif day+1 in sell_point:
+            proc.sell(day, stock, stock_prices, 20, portfolio, ledger)
+
+
+def loop_crossing_averages(n, m, stock_prices, ledger):
+    portfolio = [0] * stock_prices.shape[1]
+    for stock in range(stock_prices.shape[1]):
+        FMA = indi.moving_average(stock_prices[:, stock], m)
+        SMA = indi.moving_average(stock_prices[:, stock], n)
+        buy_point = []
+        sell_point = []
+        for x in range(1, len(stock_prices)-1):
+            if FMA[x-1] < SMA[x-1] and FMA[x+1] > SMA[x+1]:
+                buy_point.append(x)
+            elif FMA[x-1] > SMA[x-1] and FMA[x+1] < SMA[x+1]:
+                sell_point.append(x)
+        loop_trades(buy_point, sell_point, stock, stock_prices, portfolio, ledger)
+    return portfolio
+
+
+def loop_momentum(stock_prices, n, ledger):
+    portfolio = [0] * stock_prices.shape[1]
+    for stock in range(stock_prices.shape[1]):
+        result = indi.oscillator(stock_prices[:, stock], n=n, osc_type='stochastic').tolist()
+        buy_point = []
+        sell_point = []
+        for i in range(0, len(result)):
+            if result[i] > 0.2 and result[i] < 0.3:
+                if len(buy_point) > 0 and len(sell_point) > 0:
+                    if i > max(buy_point[-1], sell_point[-1]) + 5:
+                        buy_point.append(i)
+                else:
+                    buy_point.append(i)
+            elif result[i] > 0.7 and result[i] < 0.8:
+                if len(buy_point) > 0 and len(sell_point) > 0:
+                    if i > max(buy_point[-1], sell_point[-1]) + 5:
+                        sell_point.append(i)
+                else:
+                    sell_point.append(i)
+        loop_trades(buy_point, sell_point, stock, stock_prices, portfolio, ledger)
+    return portfolio
+
+
+def by_stock(ledger):
+    # The loops go stock by stock, the strategies day by day
+    transactions = ledger.to_array()
+    return transactions[np.lexsort((transactions['date'], transactions['stock']))]
+
+
+def check(run, run_loop, prices):
+    ledger, loop_ledger = proc.Ledger(), proc.Ledger()
+    portfolio = [0] * prices.shape[1]
+    run(portfolio, ledger)
+    assert portfolio == run_loop(loop_ledger)
+    np.testing.assert_array_equal(by_stock(ledger), by_stock(loop_ledger))
+
+
+def test_crossing_averages_matches_the_loops(prices):
+    for n, m in ((200, 50), (100, 20), (30, 5)):
+        check(lambda portfolio, ledger: strategy.crossing_averages(n, m, prices, 5000, 20, portfolio, ledger),
+              lambda ledger: loop_crossing_averages(n, m, prices, ledger), prices)
+
+
+def test_momentum_matches_the_loops(prices):
+    for n in (7, 14):
+        check(lambda portfolio, ledger: strategy.momentum(prices, 5000, 20, portfolio, n=n, ledger=ledger),
+              lambda ledger: loop_momentum(prices, n, ledger), prices)
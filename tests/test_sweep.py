@@ -0,0 +1,23 @@
+# Checks of the parallel parameter sweep.
+import numpy as np
+import trading.cache as cache
+import trading.sweep as sw
+
+
+def test_workers_give_the_same_results(prices):
+    grid = {'n': [100, 200], 'm': [20, 50]}
+    results = sw.sweep('crossing_averages', grid, prices, workers=0)
+    np.testing.assert_array_equal(sw.sweep('crossing_averages', grid, prices, workers=2), results)
+    row = sw.run_config('crossing_averages', {'n': 200, 'm': 20}, prices, 5000, 20)
+    assert tuple(results[(results['n'] == 200) & (results['m'] == 20)][0])[2:] == row
+    assert list(results[['n', 'm']].tolist()) == [(100, 20), (100, 50), (200, 20), (200, 50)]
+    # An amount of money, not the fraction of the peak of performance.curve_stats()
+    assert results.dtype.names[2:] == ('pnl', 'trades', 'max_drawdown_amount', 'min_equity')
+
+
+def test_worker_cache_counters_are_added(prices):
+    indicators = cache.IndicatorCache()
+    sw.sweep('momentum', {'n': [7, 14], 'osc_type': ['stochastic', 'RSI']}, prices, workers=2, cache=indicators)
+    # Each of the 4 runs needs the oscillator of the 20 stocks once
+    stats = indicators.stats()
+    assert stats['hits'] + stats['misses'] == 4 * prices.shape[1]
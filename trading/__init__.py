@@ -1 +1,18 @@
-# This file can stay empty. It's just here to tell Python that `trading` is a package and not just a folder.
+# The trading package. Submodules are imported the first time they are used
+# (e.g. trading.data), so importing the package itself, or starting the command
+# line interface, does not load NumPy or any other submodule.
+import importlib
+
+SUBMODULES = ('allocation', 'backtest', 'binary_ledger', 'cache', 'chunked', 'costs', 'data', 'files',
+              'indicators', 'instrument', 'live', 'montecarlo', 'multi', 'performance', 'process', 'rolling',
+              'strategy', 'streaming', 'sweep')
+
+
+def __getattr__(name):
+    if name in SUBMODULES:
+        return importlib.import_module('trading.' + name)
+    raise AttributeError("module 'trading' has no attribute " + repr(name))
+
+
+def __dir__():
+    return sorted(list(globals()) + list(SUBMODULES))
@@ -0,0 +1,210 @@
+# Command line entry point: python -m trading
+# Only the submodules needed by the chosen command are imported.
+import argparse
+import json
+import os
+import sys
+
+DEFAULT_CONFIG = {
+    'data': 'stock_data_5y.txt',
+    'output': 'results',
+    'available_capital': 5000,
+    'fees': 20,
+    'generate': {'days': 1825, 'initial_price': [100], 'volatility': [1], 'n_paths': 1, 'seed': None},
+    'strategies': {'crossing_averages': {'strategy': 'crossing_averages', 'n': 200, 'm': 50},
+                   'momentum': {'strategy': 'momentum', 'n': 7, 'osc_type': 'stochastic'}},
+    'sweep': {'strategy': 'crossing_averages', 'grid': {'n': [100, 150, 200], 'm': [20, 50]}, 'workers': None},
+}
+
+
+def read_config(path=None):
+    '''
+    Reads a configuration file (JSON, or TOML with Python 3.11 or later), on top of
+    DEFAULT_CONFIG. The settings given in the 'generate' and 'sweep' sections replace
+    the default ones, the others keep their default value. A 'strategies' section
+    replaces the default strategy runs, each run needs a 'strategy' key.
+
+    Input:
+        path (str, default None): path to the configuration file, None for the defaults.
+
+    Output:
+        config (dict): the configuration.
+    '''
+    config = dict(DEFAULT_CONFIG)
+    if path is None:
+        return config
+    if path.endswith('.toml'):
+        try:
+            import tomllib
+        except ImportError:
+            raise ValueError('TOML configuration files need Python 3.11 or later, use JSON instead')
+        with open(path, 'rb') as f:
+            settings = tomllib.load(f)
+    else:
+        with open(path) as f:
+            settings = json.load(f)
+    for name, value in settings.items():
+        if name in ('generate', 'sweep'):
+            # Only the settings given replace the defaults of the section
+            config[name] = dict(DEFAULT_CONFIG[name], **value)
+        else:
+            config[name] = value
+    for name, run in config['strategies'].items():
+        if 'strategy' not in run:
+            raise ValueError('Strategy run ' + repr(name) + ' has no "strategy" key, '
+                             'e.g. "strategy": "crossing_averages"')
+    return config
+
+
+def load_prices(datafile):
+    '''
+    Loads the price data of a text data file (through its binary cache) or of a .npy file.
+    Generated paths are flattened to one column per stock and path.
+    '''
+    import numpy as np
+    import trading.data as data
+    if datafile.endswith('.npy'):
+        prices = np.load(datafile, mmap_mode='r')
+    else:
+        prices = data.load_data(datafile)[0]
+    return prices.reshape(len(prices), -1)
+
+
+def cost_model(fees):
+    '''
+    Fixed fees (a number) or the parameters of a trading.costs.CostModel (a dict).
+    '''
+    if isinstance(fees, dict):
+        import trading.costs as costs
+        return costs.CostModel(**fees)
+    return fees
+
+
+def _output_path(config, name):
+    os.makedirs(config['output'], exist_ok=True)
+    return os.path.join(config['output'], name)
+
+
+def generate(config):
+    '''
+    Generates price paths and saves them as prices.npy, (days, stocks) for
+    one path or (days, stocks, paths) for several.
+    '''
+    import numpy as np
+    import trading.data as data
+    settings = config['generate']
+    prices = data.generate_stock_paths(settings['days'], settings['initial_price'], settings['volatility'],
+                                       settings.get('n_paths', 1), settings.get('seed'))
+    if prices.shape[2] == 1:
+        prices = prices[:, :, 0]
+    path = _output_path(config, 'prices.npy')
+    np.save(path, prices)
+    return [path]
+
+
+def backtest(config):
+    '''
+    Runs every strategy of the configuration in a single pass over the data, and
+    saves equity.npy (one row per strategy), stats.npy, shares.npy and one binary
+    ledger per strategy (ledger_<name>.bin).
+    '''
+    import numpy as np
+    import trading.binary_ledger as binary
+    import trading.multi as multi
+    strategies = {}
+    for name, settings in config['strategies'].items():
+        params = dict(settings)
+        strategies[name] = (params.pop('strategy'), params)
+    equity, stats, shares, ledgers = multi.run_strategies(strategies, load_prices(config['data']),
+                                                          config['available_capital'], cost_model(config['fees']))
+    paths = []
+    for name, result in (('equity.npy', equity), ('stats.npy', stats), ('shares.npy', shares)):
+        paths.append(_output_path(config, name))
+        np.save(paths[-1], result)
+    for name, ledger in ledgers.items():
+        paths.append(_output_path(config, 'ledger_' + name + '.bin'))
+        binary.remove_ledger(paths[-1])
+        binary.append_records(paths[-1], ledger.to_array())
+    return paths
+
+
+def sweep(config):
+    '''
+    Runs a strategy over the grid of parameters of the configuration, and saves
+    the results as sweep.npy (see trading.sweep.sweep()).
+    '''
+    import numpy as np
+    import trading.sweep as sw
+    settings = config['sweep']
+    results = sw.sweep(settings['strategy'], settings['grid'], np.asarray(load_prices(config['data'])),
+                       config['available_capital'], cost_model(config['fees']), settings.get('workers'))
+    path = _output_path(config, 'sweep.npy')
+    np.save(path, results)
+    return [path]
+
+
+def report(files, sort=None, top=None):
+    '''
+    Formats results saved by backtest (stats.npy) or sweep (sweep.npy) as a table.
+    '''
+    import numpy as np
+    lines = []
+    for path in files:
+        results = np.load(path)
+        if sort is not None:
+            results = results[np.argsort(-results[sort], kind='stable')]
+        if top is not None:
+            results = results[:top]
+        names = results.dtype.names
+        lines.append(path)
+        lines.append(' '.join('{:>14}'.format(name) for name in names))
+        for row in results:
+            cells = []
+            for name in names:
+                value = row[name]
+                if np.ndim(value) > 0:
+                    cells.append('{:>14}'.format(str(value.tolist())))
+                elif isinstance(value, (float, np.floating)):
+                    cells.append('{:>14.4f}'.format(value))
+                else:
+                    cells.append('{:>14}'.format(str(value)))
+            lines.append(' '.join(cells))
+        lines.append('')
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m trading', description='Backtests of trading strategies.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    for name, text in (('generate', 'generate price paths'),
+                       ('backtest', 'run the strategies of the configuration'),
+                       ('sweep', 'run a strategy over a grid of parameters')):
+        command = commands.add_parser(name, help=text)
+        command.add_argument('--config', help='configuration file (JSON, or TOML with Python 3.11+)')
+        command.add_argument('--data', help='price data: text data file or .npy file')
+        command.add_argument('--output', help='folder for the results')
+    command = commands.add_parser('report', help='print results saved by backtest or sweep')
+    command.add_argument('files', nargs='+', help='stats.npy or sweep.npy files')
+    command.add_argument('--sort', help='field to sort by, largest first')
+    command.add_argument('--top', type=int, help='number of rows to show')
+    args = parser.parse_args(argv)
+
+    if args.command == 'report':
+        print(report(args.files, args.sort, args.top))
+        return 0
+    try:
+        config = read_config(args.config)
+    except ValueError as error:
+        parser.error(str(error))
+    if args.data:
+        config['data'] = args.data
+    if args.output:
+        config['output'] = args.output
+    run = {'generate': generate, 'backtest': backtest, 'sweep': sweep}[args.command]
+    for path in run(config):
+        print('Saved', path)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
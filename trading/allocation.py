@@ -0,0 +1,180 @@
+# Allocate capital across all the stocks, and rebalance to target weights.
+import numpy as np
+import trading.costs as costs
+import trading.process as proc
+
+
+def normalize_weights(weights, prices):
+    '''
+    Makes weights usable as target weights: negative weights and stocks without
+    a price become 0, and the weights of each day add up to 1.
+
+    Input:
+        weights (ndarray): weight of each stock, one row per day (or a single row).
+        prices (ndarray): the prices of the same days, NaN when a stock has no price.
+
+    Output:
+        weights (ndarray): the normalized weights, all 0 on a day without any positive weight.
+    '''
+    weights = np.where(np.isnan(prices) | ~(weights > 0), 0, weights)
+    total = weights.sum(axis=-1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(total > 0, weights / total, 0)
+
+
+def equal_weights(stock_prices):
+    '''
+    The same weight for every stock with a price.
+
+    Input:
+        stock_prices (ndarray): the stock price data (or the prices of one day).
+
+    Output:
+        weights (ndarray): target weights, same shape as stock_prices.
+    '''
+    return normalize_weights(np.ones(np.shape(stock_prices)), stock_prices)
+
+
+def volatility_weights(volatility, stock_prices):
+    '''
+    Weights inversely proportional to the volatility of each stock, so that every
+    stock adds about the same risk.
+
+    Input:
+        volatility (ndarray): volatility of each stock, e.g. the header row of the
+            data file (returned by trading.data.load_data()).
+        stock_prices (ndarray): the stock price data (or the prices of one day).
+
+    Output:
+        weights (ndarray): target weights, same shape as stock_prices.
+
+    Example:
+        >>> prices, volatility, initial_price = data.load_data('stock_data_5y.txt')
+        >>> weights = volatility_weights(volatility, prices)
+    '''
+    with np.errstate(divide='ignore'):
+        inverse = 1 / np.asarray(volatility, dtype=float)
+    return normalize_weights(np.broadcast_to(inverse, np.shape(stock_prices)), stock_prices)
+
+
+def signal_weights(signal, stock_prices):
+    '''
+    Weights proportional to the strength of a signal, stocks with a signal below
+    0 get nothing.
+
+    Input:
+        signal (ndarray): strength of the signal for each stock, one row per day,
+            e.g. (fast - slow) / slow for two moving averages, or 0.5 - oscillator level.
+        stock_prices (ndarray): the stock price data (or the prices of one day).
+
+    Output:
+        weights (ndarray): target weights, same shape as stock_prices. On a day
+            without any positive signal all the weights are 0 (all in cash).
+    '''
+    return normalize_weights(np.nan_to_num(np.asarray(signal, dtype=float)), stock_prices)
+
+
+def rebalance(portfolio, date, weights, stock_prices, fees, ledger_file=None):
+    '''
+    Buys and sells shares so the portfolio gets as close as possible to target weights,
+    without spending more than its cash.
+
+    The value of the portfolio (cash plus shares at today's prices) is shared
+    between the stocks according to the weights. The shares above their target are
+    sold first (unless the sale brings in less than its fees), then the purchases
+    are made with the cash available: if it does not cover every purchase (fees
+    included), all of them are scaled down by the same factor. All the stocks are
+    handled together, in a time linear in their number.
+    Stocks without a price today are left as they are.
+
+    Input:
+        portfolio (Portfolio): our current portfolio, with its cash, updated in-place.
+        date (int): the date of the rebalance (nb of days since day 0)
+        weights (ndarray): target weight of each stock, see normalize_weights().
+        stock_prices (ndarray): the stock price data
+        fees (float or CostModel): transaction fees (fixed amount per transaction),
+            or the cost model of the transactions
+        ledger_file (str, Ledger or None, default None): where to record the transactions
+
+    Output: None
+
+    Example:
+        Split 100000 equally between all the stocks on day 0:
+            >>> portfolio = proc.Portfolio(sim_data.shape[1], cash=100000)
+            >>> rebalance(portfolio, 0, equal_weights(sim_data[0]), sim_data, 20)
+    '''
+    model = costs.as_cost_model(fees)
+    prices = stock_prices[date]
+    missing = np.isnan(prices)
+    prices = np.where(missing, 1, prices)
+    weights = normalize_weights(np.asarray(weights, dtype=float), stock_prices[date])
+    # Number of shares of each stock at its target weight
+    value = portfolio.value(stock_prices[date])
+    target = np.where(missing, portfolio.shares, np.floor(weights * max(value, 0) / prices)).astype(np.int64)
+    # Sell the shares above the targets, their cash pays for the purchases. A sale
+    # bringing in less than its fees would only cost cash, it is skipped
+    excess = portfolio.shares - target
+    proceeds = np.maximum(excess, 0) * model.sell_prices(prices)
+    stocks = np.nonzero((excess > 0) & (proceeds - model.fees(proceeds) > 0))[0]
+    portfolio.sell_many(date, stocks, stock_prices, model, ledger_file, excess[stocks])
+    # Money needed to buy the shares below the targets, fees included
+    stocks = np.nonzero(target > portfolio.shares)[0]
+    buy_prices = model.buy_prices(prices[stocks])
+    needed = (target[stocks] - portfolio.shares[stocks]) * buy_prices
+    budgets = needed + model.fees(needed)
+    total = budgets.sum()
+    if total > 0 and total > portfolio.cash:
+        budgets = budgets * (max(portfolio.cash, 0) / total)
+    # Skip the purchases too small to buy a single share
+    keep = model.affordable(budgets, buy_prices) > 0
+    portfolio.buy_many(date, stocks[keep], budgets[keep], stock_prices, model, ledger_file)
+
+
+def run_allocation(stock_prices, weights, period=21, initial_capital=100000, fees=20,
+                   ledger_file='ledger_allocation.txt', portfolio=None):
+    '''
+    Rebalances a portfolio to target weights every period days, starting on day 0.
+
+    Input:
+        stock_prices (ndarray): the stock price data
+        weights (ndarray): target weight of each stock, either one row for every day
+            or a single row used on every rebalance, e.g. from equal_weights(),
+            volatility_weights() or signal_weights().
+        period (int, default 21): number of days between two rebalances.
+        initial_capital (float, default 100000): cash at the start.
+        fees (float or CostModel, default 20): transaction fees (fixed amount per
+            transaction), or the cost model of the transactions
+        ledger_file (str, Ledger or None, default 'ledger_allocation.txt'): path to the
+            ledger file, a Ledger, or None to record nothing.
+        portfolio (Portfolio, default None): the portfolio to rebalance, a new one with
+            initial_capital in cash if None.
+
+    Output:
+        portfolio (Portfolio): the portfolio at the end.
+        equity (ndarray): the value of the portfolio (cash plus shares) each day.
+
+    Example:
+        Equal weights, rebalanced every month:
+            >>> portfolio, equity = run_allocation(sim_data, equal_weights(sim_data), 21)
+    '''
+    days, n_stocks = stock_prices.shape
+    if portfolio is None:
+        portfolio = proc.Portfolio(n_stocks, cash=initial_capital)
+    weights = np.broadcast_to(weights, stock_prices.shape)
+    if isinstance(ledger_file, str):
+        ledger = proc.Ledger(ledger_file)
+    else:
+        ledger = ledger_file
+    # Stocks without a price are worth nothing
+    values = np.where(np.isnan(stock_prices), 0, stock_prices)
+    equity = np.zeros(days)
+    last = 0
+    for day in range(0, days, period):
+        # The positions have not changed since the last rebalance
+        equity[last:day] = portfolio.cash + values[last:day] @ portfolio.shares
+        rebalance(portfolio, day, weights[day], stock_prices, fees, ledger)
+        last = day
+    equity[last:] = portfolio.cash + values[last:] @ portfolio.shares
+    if ledger is not ledger_file:
+        ledger.close()
+    return portfolio, equity
@@ -0,0 +1,242 @@
+# Event-driven backtest engine working on all stocks at once.
+import numpy as np
+import trading.indicators as indi
+import trading.process as proc
+
+# Parameters of each strategy run by name, with their default values
+STRATEGY_PARAMS = {
+    'random': {'period': 7, 'seed': None},
+    'crossing_averages': {'n': 200, 'm': 50},
+    'momentum': {'n': 7, 'osc_type': 'stochastic', 'buy_range': (0.2, 0.3), 'sell_range': (0.7, 0.8),
+                 'cooldown': 5},
+}
+
+
+def crossing_signals(fast, slow):
+    '''
+    Finds the days to buy or sell when a fast moving average crosses a slow one.
+
+    A crossing on day x is found by comparing the averages on days x-1 and x+1.
+    The transaction happens the day before the crossing (day x-1).
+
+    Input:
+        fast (ndarray): fast moving average over time, one column per stock.
+        slow (ndarray): slow moving average over time, same shape as fast.
+
+    Output:
+        buy (ndarray): boolean array, True on the days to buy each stock.
+        sell (ndarray): boolean array, True on the days to sell each stock.
+    '''
+    buy = np.zeros(fast.shape, dtype=bool)
+    sell = np.zeros(fast.shape, dtype=bool)
+    # The fast average goes from below to above the slow one: buy
+    buy[:-2] = (fast[:-2] < slow[:-2]) & (fast[2:] > slow[2:])
+    # The fast average goes from above to below the slow one: sell
+    sell[:-2] = (fast[:-2] > slow[:-2]) & (fast[2:] < slow[2:])
+    return buy, sell
+
+
+def threshold_signals(osc, buy_range=(0.2, 0.3), sell_range=(0.7, 0.8), cooldown=5):
+    '''
+    Finds the days to buy or sell when an oscillator is inside a threshold band.
+
+    Once a stock has been both bought and sold, a new signal needs to come more
+    than cooldown days after the last one. The transaction happens the day
+    before the signal.
+
+    Input:
+        osc (ndarray): oscillator level over time, one column per stock.
+        buy_range (tuple, default (0.2, 0.3)): buy when the level is strictly inside this band.
+        sell_range (tuple, default (0.7, 0.8)): sell when the level is strictly inside this band.
+        cooldown (int, default 5): minimum number of days between two signals.
+
+    Output:
+        buy (ndarray): boolean array, True on the days to buy each stock.
+        sell (ndarray): boolean array, True on the days to sell each stock.
+    '''
+    osc = np.asarray(osc)
+    stocks = osc.shape[1:]
+    signal_buy, signal_sell = cooldown_signals(osc, buy_range, sell_range, cooldown,
+                                               np.full(stocks, -1), np.full(stocks, -1))
+    # Trade the day before the signal
+    buy = np.zeros(osc.shape, dtype=bool)
+    sell = np.zeros(osc.shape, dtype=bool)
+    buy[:-1] = signal_buy[1:]
+    sell[:-1] = signal_sell[1:]
+    return buy, sell
+
+
+def cooldown_signals(osc, buy_range, sell_range, cooldown, last_buy, last_sell, first_day=0):
+    '''
+    Signal pass of threshold_signals(), on the days of the signals (not the
+    transactions). The state of the cooldown is kept in last_buy and last_sell,
+    so the days can be processed a block at a time.
+
+    Input:
+        osc (ndarray): oscillator level over a block of days, one column per stock.
+        buy_range, sell_range, cooldown: see threshold_signals().
+        last_buy (ndarray): day of the last buy signal of each stock (-1 if none),
+            updated in-place.
+        last_sell (ndarray): day of the last sell signal of each stock (-1 if none),
+            updated in-place.
+        first_day (int, default 0): day of the first row of osc.
+
+    Output:
+        signal_buy (ndarray): boolean array, True on the days of a buy signal.
+        signal_sell (ndarray): boolean array, True on the days of a sell signal.
+    '''
+    # Threshold tests for all days and stocks at once
+    in_buy = (osc > buy_range[0]) & (osc < buy_range[1])
+    in_sell = (osc > sell_range[0]) & (osc < sell_range[1])
+    signal_buy = np.zeros(osc.shape, dtype=bool)
+    signal_sell = np.zeros(osc.shape, dtype=bool)
+    # Only the days with a candidate signal need the cooldown check
+    for i in np.nonzero((in_buy | in_sell).any(axis=1))[0]:
+        day = first_day + i
+        # The cooldown only applies once both a buy and a sell have happened
+        cooling = (last_buy >= 0) & (last_sell >= 0) & (day <= np.maximum(last_buy, last_sell) + cooldown)
+        signal_buy[i] = in_buy[i] & ~cooling
+        signal_sell[i] = in_sell[i] & ~cooling
+        last_buy[signal_buy[i]] = day
+        last_sell[signal_sell[i]] = day
+    return signal_buy, signal_sell
+
+
+def random_signals(days, n_stocks, period=7, n_paths=1, rng=None):
+    '''
+    Randomly decides, every period, to buy all stocks, sell all stocks or do
+    nothing (with equal probability), independently for each price path.
+
+    Input:
+        days (int): number of days.
+        n_stocks (int): number of stocks in each path.
+        period (int, default 7): how often we buy/sell (days), starting on day 1.
+        n_paths (int, default 1): number of price paths.
+        rng (Generator, default None): random generator, a new one if None.
+
+    Output:
+        buy (ndarray): boolean array, True on the days to buy each stock. The shape is
+            (days, n_stocks * n_paths), the columns of a (days, n_stocks, n_paths) array.
+        sell (ndarray): boolean array, True on the days to sell each stock.
+    '''
+    if rng is None:
+        rng = np.random.default_rng()
+    # Days on which we decide, the last incomplete period is skipped
+    length = (days - 1) - (days - 1) % period
+    decision_days = np.arange(1, length, period)
+    # 0: buy, 1: sell, 2: nothing
+    action = rng.integers(0, 3, (len(decision_days), 1, n_paths))
+    buy = np.zeros((days, n_stocks, n_paths), dtype=bool)
+    sell = np.zeros((days, n_stocks, n_paths), dtype=bool)
+    buy[decision_days] = action == 0
+    sell[decision_days] = action == 1
+    return buy.reshape(days, -1), sell.reshape(days, -1)
+
+
+def strategy_params(strategy_name, params):
+    '''
+    Parameters of a strategy run by name, with the defaults of STRATEGY_PARAMS
+    for those not given.
+
+    Input:
+        strategy_name (str): 'random', 'crossing_averages' or 'momentum'
+        params (dict): parameters of the strategy.
+
+    Output:
+        params (dict): every parameter of the strategy.
+    '''
+    if strategy_name not in STRATEGY_PARAMS:
+        raise ValueError('Unknown strategy: ' + str(strategy_name))
+    defaults = STRATEGY_PARAMS[strategy_name]
+    unknown = set(params) - set(defaults)
+    if unknown:
+        raise ValueError('Unknown parameters of ' + strategy_name + ': ' + ', '.join(sorted(unknown)))
+    return dict(defaults, **params)
+
+
+def strategy_signals(strategy_name, stock_prices, params, indicators=indi, n_paths=1, rng=None):
+    '''
+    Buy and sell signals of a strategy run by name, for all columns of a price matrix,
+    as the functions of trading.strategy find them.
+
+    Input:
+        strategy_name (str): 'random', 'crossing_averages' or 'momentum'
+        stock_prices (ndarray): the stock price data, one column per stock (and path)
+        params (dict): parameters of the strategy, see STRATEGY_PARAMS: period and seed
+            for 'random', n and m for 'crossing_averages', n, osc_type, buy_range,
+            sell_range and cooldown for 'momentum'. The others take their default value.
+        indicators (module or IndicatorCache, default trading.indicators): where the
+            indicators come from.
+        n_paths (int, default 1): number of paths in the columns, for 'random'.
+        rng (Generator, default None): random generator for 'random', if None a new
+            one seeded with the seed parameter.
+
+    Output:
+        buy (ndarray): boolean array, True on the days to buy each column.
+        sell (ndarray): boolean array, True on the days to sell each column.
+    '''
+    params = strategy_params(strategy_name, params)
+    if strategy_name == 'random':
+        if rng is None:
+            rng = np.random.default_rng(params['seed'])
+        days, columns = stock_prices.shape
+        return random_signals(days, columns // n_paths, params['period'], n_paths, rng)
+    if strategy_name == 'crossing_averages':
+        fast = indicators.moving_average(stock_prices, n=params['m'])
+        slow = indicators.moving_average(stock_prices, n=params['n'])
+        return crossing_signals(fast, slow)
+    osc = indicators.oscillator(stock_prices, n=params['n'], osc_type=params['osc_type'])
+    return threshold_signals(osc, params['buy_range'], params['sell_range'], params['cooldown'])
+
+
+def run_signals(buy, sell, stock_prices, available_capital, fees, portfolio, ledger_file, first_day=0):
+    '''
+    Executes buy and sell signals for all stocks, walking through time once.
+
+    On each day with a signal, every stock to buy spends at most available_capital
+    (as proc.buy() does) and every stock to sell is sold entirely (as proc.sell() does).
+    A stock with both signals on the same day is only bought.
+
+    Input:
+        buy (ndarray): boolean array (days x stocks), True on the days to buy each stock.
+        sell (ndarray): boolean array (days x stocks), True on the days to sell each stock.
+        stock_prices (ndarray): the stock price data
+        available_capital (float): the maximum amount to spend on each purchase
+            (must cover fees)
+        fees (float or CostModel): transaction fees (fixed amount per transaction),
+            or the cost model of the transactions
+        portfolio (list, ndarray or Portfolio): our current portfolio, updated in-place
+        ledger_file (str or Ledger): path to the ledger file, or a Ledger
+        first_day (int, default 0): day of the first row of buy and sell, when they
+            only cover a block of days. stock_prices is always indexed by day.
+
+    Output: None
+    '''
+    if isinstance(ledger_file, proc.Ledger):
+        _execute(buy, sell, stock_prices, available_capital, fees, portfolio, ledger_file, first_day)
+    else:
+        # Buffer the transactions and write them to the file at the end
+        with proc.Ledger(ledger_file) as ledger:
+            _execute(buy, sell, stock_prices, available_capital, fees, portfolio, ledger, first_day)
+
+
+def _execute(buy, sell, stock_prices, available_capital, fees, portfolio, ledger, first_day):
+    '''
+    Body of run_signals(), with the transactions recorded in a Ledger.
+    '''
+    if isinstance(portfolio, proc.Portfolio):
+        positions = portfolio
+    else:
+        positions = proc.Portfolio(len(portfolio))
+        positions.shares[:] = portfolio
+    sell = sell & ~buy
+    # Skip the days without any signal
+    for i in np.nonzero((buy | sell).any(axis=1))[0]:
+        # Buy every stock with a signal (and a price today), then sell all the
+        # shares of every stock with a signal
+        day = first_day + i
+        positions.buy_many(day, np.nonzero(buy[i])[0], available_capital, stock_prices, fees, ledger)
+        positions.sell_many(day, np.nonzero(sell[i])[0], stock_prices, fees, ledger)
+    if positions is not portfolio:
+        # Update portfolio in-place
+        portfolio[:] = positions.shares.tolist()
@@ -0,0 +1,193 @@
+# Binary ledger files: fixed-width records, appendable and memory-mappable.
+import os
+import numpy as np
+import trading.files as files
+import trading.process as proc
+
+# Every binary ledger starts with this header, then one record per transaction
+MAGIC = b'TRLEDGER'
+VERSION = 1
+HEADER = np.dtype([('magic', 'S8'), ('version', '<u4'), ('itemsize', '<u4')])
+RECORD_DTYPE = proc.TRANSACTION_DTYPE.newbyteorder('<')
+# Number of records a saved index is checked against, see LedgerIndex
+SAMPLES = 64
+
+
+def is_binary_ledger(path):
+    '''
+    Tells whether a file is a binary ledger, from its first bytes.
+    '''
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def append_records(path, transactions):
+    '''
+    Appends transactions to a binary ledger file, creating it if needed.
+
+    Input:
+        path (str): path to the binary ledger file.
+        transactions (ndarray): records with proc.TRANSACTION_DTYPE.
+    '''
+    with open(path, 'ab') as f:
+        if f.tell() == 0:
+            np.array([(MAGIC, VERSION, RECORD_DTYPE.itemsize)], dtype=HEADER).tofile(f)
+        np.asarray(transactions, dtype=RECORD_DTYPE).tofile(f)
+
+
+def read_binary(path, mmap=True):
+    '''
+    Reads the transactions of a binary ledger file.
+
+    Input:
+        path (str): path to the binary ledger file.
+        mmap (bool, default True): map the file instead of reading it into memory.
+
+    Output:
+        transactions (ndarray): records with proc.TRANSACTION_DTYPE (read-only if mapped).
+    '''
+    header = np.fromfile(path, dtype=HEADER, count=1)
+    if len(header) == 0 or header['magic'][0] != MAGIC:
+        raise ValueError(path + ' is not a binary ledger')
+    if header['version'][0] != VERSION or header['itemsize'][0] != RECORD_DTYPE.itemsize:
+        raise ValueError(path + ' has an unsupported binary ledger version')
+    count = (os.path.getsize(path) - HEADER.itemsize) // RECORD_DTYPE.itemsize
+    if count == 0:
+        return np.zeros(0, dtype=proc.TRANSACTION_DTYPE)
+    if mmap:
+        return np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=HEADER.itemsize, shape=(count,))
+    return np.fromfile(path, dtype=RECORD_DTYPE, offset=HEADER.itemsize, count=count)
+
+
+class BinaryLedger(proc.Ledger):
+    '''
+    Ledger writing its transactions to a binary ledger file instead of a text file.
+
+    It collects the transactions like proc.Ledger and can be used wherever a Ledger
+    is accepted. Fees are kept in the file.
+
+    Input:
+        ledger_file (str): path to the binary ledger file, the records are appended.
+        capacity (int, default 4096): number of transactions kept before writing to disk.
+
+    Example:
+        >>> with BinaryLedger('ledger_momentum.bin') as ledger:
+        ...     strategy.momentum(sim_data, 5000, 20, portfolio, ledger=ledger)
+    '''
+    def __init__(self, ledger_file, capacity=4096):
+        super().__init__(ledger_file, capacity)
+
+    def flush(self):
+        '''
+        Appends the buffered transactions to ledger_file and empties the buffer.
+        '''
+        if self.size == 0:
+            return
+        append_records(self.ledger_file, self.to_array())
+        self.size = 0
+
+
+def index_path(ledger_file):
+    '''
+    Returns the path of the index of a binary ledger file, see LedgerIndex.
+    '''
+    return ledger_file + '.idx.npz'
+
+
+def remove_ledger(ledger_file):
+    '''
+    Deletes a binary ledger file and its index, if they exist.
+    '''
+    for path in (ledger_file, index_path(ledger_file)):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _matches(transactions, order, stock, date):
+    '''
+    Tells whether a saved index still sorts the records, from SAMPLES of them only.
+    '''
+    if len(order) != len(transactions):
+        return False
+    sample = np.linspace(0, len(order) - 1, min(SAMPLES, len(order))).astype(np.int64)
+    rows = order[sample]
+    if np.any((rows < 0) | (rows >= len(order))):
+        return False
+    return bool(np.array_equal(transactions['stock'][rows], stock[sample])
+                and np.array_equal(transactions['date'][rows], date[sample]))
+
+
+class LedgerIndex:
+    '''
+    Index of a binary ledger by stock and date, to find transactions without a full scan.
+
+    The index (the order of the records sorted by stock, then date, and the sorted
+    stocks and dates) is saved next to the ledger as <ledger_file>.idx.npz, with the
+    size and modification time of the ledger it was built from. It is rebuilt when
+    the ledger has changed, or when a sample of the records does not match the index
+    (a ledger rewritten within one tick of a coarse file system clock keeps its size
+    and modification time). Opening a ledger with a valid index reads SAMPLES records.
+
+    Input:
+        ledger_file (str): path to the binary ledger file.
+
+    Example:
+        All trades for stock 7 between day 300 and 600:
+            >>> LedgerIndex('ledger_momentum.bin').query(7, 300, 600)
+    '''
+    def __init__(self, ledger_file):
+        self.transactions = read_binary(ledger_file)
+        index_file = index_path(ledger_file)
+        stat = os.stat(ledger_file)
+        self.order = None
+        if os.path.exists(index_file):
+            with np.load(index_file) as saved:
+                if ('stock' in saved and saved['size'] == stat.st_size and saved['mtime'] == stat.st_mtime_ns
+                        and _matches(self.transactions, saved['order'], saved['stock'], saved['date'])):
+                    self.order, self.stock, self.date = saved['order'], saved['stock'], saved['date']
+        if self.order is None:
+            # Stable sort, so equal (stock, date) keep their order in the ledger
+            stock = np.asarray(self.transactions['stock'])
+            date = np.asarray(self.transactions['date'])
+            self.order = np.lexsort((date, stock))
+            self.stock, self.date = stock[self.order], date[self.order]
+            files.replace_file(index_file, lambda f: np.savez(f, order=self.order, stock=self.stock,
+                                                              date=self.date, size=stat.st_size,
+                                                              mtime=stat.st_mtime_ns))
+
+    def query(self, stock, start=0, end=None):
+        '''
+        Returns the transactions of a stock from day start to day end (both included),
+        in time order.
+        '''
+        first = np.searchsorted(self.stock, stock, 'left')
+        last = np.searchsorted(self.stock, stock, 'right')
+        dates = self.date[first:last]
+        low = first + np.searchsorted(dates, start, 'left')
+        high = last if end is None else first + np.searchsorted(dates, end, 'right')
+        return np.asarray(self.transactions[self.order[low:high]])
+
+
+def text_to_binary(text_file, binary_file):
+    '''
+    Converts a text ledger file to a binary ledger file (replaced if it exists).
+    Text ledgers do not store fees, they are NaN in the binary file.
+    '''
+    # Imported here, trading.performance reads binary ledgers with this module
+    import trading.performance as perf
+    remove_ledger(binary_file)
+    append_records(binary_file, perf.read_transactions(text_file))
+
+
+def binary_to_text(binary_file, text_file):
+    '''
+    Converts a binary ledger file to a text ledger file (replaced if it exists),
+    in the format of proc.log_transaction().
+    '''
+    transactions = read_binary(binary_file)
+    lines = map(proc.format_transaction,
+                [proc.TRANSACTION_TYPES[code] for code in transactions['type'].tolist()],
+                transactions['date'].tolist(), transactions['stock'].tolist(),
+                transactions['shares'].tolist(), transactions['amount'].tolist())
+    with open(text_file, 'w') as f:
+        f.write(''.join(lines))
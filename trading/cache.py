@@ -0,0 +1,168 @@
+# Cache of indicator results, to avoid computing the same indicator twice.
+import hashlib
+import os
+from collections import OrderedDict
+import numpy as np
+import trading.files as files
+import trading.indicators as indi
+
+# Length of the keys, the names of the files under cache_dir (SHA-1 hex digests)
+KEY_LENGTH = 40
+
+
+class IndicatorCache:
+    '''
+    Memoizes trading.indicators functions, one price column at a time.
+
+    Each result is keyed on a hash of the price column and the indicator parameters.
+    Results are kept in memory up to max_bytes, evicting the least recently used
+    first, and optionally saved as .npy files under cache_dir. Files are written
+    atomically, so several processes (e.g. the workers of a parameter sweep) can
+    share one cache_dir; the memory part stays private to each process. Nothing is
+    ever removed from cache_dir by the cache itself: it grows with every new price
+    column and parameter set, until clear_disk() is called.
+
+    Input:
+        max_bytes (int, default 64 MB): memory used by the cached results at most.
+        cache_dir (str, default None): folder for the results on disk, None to keep
+            them in memory only.
+
+    Example:
+        >>> cache = IndicatorCache(cache_dir='.indicator_cache')
+        >>> slow = cache.moving_average(sim_data, 200)
+        >>> cache.stats()
+    '''
+    def __init__(self, max_bytes=64 * 2**20, cache_dir=None):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def __getstate__(self):
+        # A copy sent to another process starts with an empty memory part, its
+        # counters are only seen here if the process sends them back (see add_counters())
+        state = self.__dict__.copy()
+        state['entries'] = OrderedDict()
+        state['nbytes'] = 0
+        return state
+
+    def stats(self):
+        '''
+        Returns the hit and miss counters, and the memory used.
+        '''
+        return {'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses,
+                'entries': len(self.entries), 'nbytes': self.nbytes}
+
+    def counters(self):
+        '''
+        Returns the hit and miss counters only, e.g. to send them back from a worker process.
+        '''
+        return {'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses}
+
+    def add_counters(self, counters):
+        '''
+        Adds hit and miss counters from counters() (e.g. of the copy of the cache
+        used by a worker process) to this cache.
+        '''
+        self.hits += counters['hits']
+        self.disk_hits += counters['disk_hits']
+        self.misses += counters['misses']
+
+    def clear(self):
+        '''
+        Empties the memory part of the cache (files on disk are kept).
+        '''
+        self.entries.clear()
+        self.nbytes = 0
+
+    def clear_disk(self):
+        '''
+        Deletes the results saved under cache_dir, e.g. between two sweeps on other data.
+        The memory part and the files of other programs in cache_dir are kept.
+        '''
+        if self.cache_dir is None:
+            return
+        for name in os.listdir(self.cache_dir):
+            key, extension = os.path.splitext(name)
+            if extension == '.npy' and len(key) == KEY_LENGTH and all(c in '0123456789abcdef' for c in key):
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except FileNotFoundError:
+                    # Another process sharing cache_dir removed it first
+                    pass
+
+    def _key(self, column, params):
+        digest = hashlib.sha1(np.ascontiguousarray(column, dtype=float).tobytes())
+        digest.update(repr(params).encode())
+        return digest.hexdigest()
+
+    def _get(self, key):
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+        if self.cache_dir is not None:
+            path = os.path.join(self.cache_dir, key + '.npy')
+            try:
+                result = np.load(path)
+            except FileNotFoundError:
+                # Not saved yet, or removed by clear_disk() in another process
+                result = None
+            if result is not None:
+                self.disk_hits += 1
+                self._keep(key, result)
+                return result
+        self.misses += 1
+        return None
+
+    def _keep(self, key, result):
+        # Cached results are shared between callers, nobody may change them
+        result.setflags(write=False)
+        if result.nbytes > self.max_bytes:
+            return
+        self.entries[key] = result
+        self.nbytes += result.nbytes
+        # Evict the least recently used results
+        while self.nbytes > self.max_bytes:
+            old_key, old_result = self.entries.popitem(last=False)
+            self.nbytes -= old_result.nbytes
+
+    def _put(self, key, result):
+        self._keep(key, result)
+        if self.cache_dir is not None:
+            files.replace_file(os.path.join(self.cache_dir, key + '.npy'), lambda f: np.save(f, result))
+
+    def _compute(self, function, stock_price, params):
+        '''
+        Looks up each column of stock_price, and computes the missing ones together.
+        '''
+        stock_price = np.asarray(stock_price, dtype=float)
+        columns = stock_price.reshape(len(stock_price), -1)
+        keys = [self._key(columns[:, i], (function.__name__, params)) for i in range(columns.shape[1])]
+        results = [self._get(key) for key in keys]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            computed = function(columns[:, missing], **params)
+            if computed is None:
+                return None
+            for j, i in enumerate(missing):
+                results[i] = np.array(computed[:, j])
+                self._put(keys[i], results[i])
+        return np.stack(results, axis=1).reshape(stock_price.shape)
+
+    def moving_average(self, stock_price, n=7, weights=[]):
+        '''
+        Cached trading.indicators.moving_average(), same inputs and output.
+        '''
+        return self._compute(indi.moving_average, stock_price, {'n': n, 'weights': list(weights)})
+
+    def oscillator(self, stock_price, n=7, osc_type='stochastic'):
+        '''
+        Cached trading.indicators.oscillator(), same inputs and output.
+        '''
+        return self._compute(indi.oscillator, stock_price, {'n': n, 'osc_type': osc_type})
@@ -0,0 +1,294 @@
+# Backtests on price data read a block of days at a time.
+import itertools
+import numpy as np
+import trading.backtest as bt
+import trading.process as proc
+import trading.rolling as rolling
+
+
+def iter_text_blocks(datafile='stock_data_5y.txt', block_size=256, skiprows=1):
+    '''
+    Reads a text data file a block of days at a time.
+
+    Input:
+        datafile (str, default 'stock_data_5y.txt'): path to the text data file.
+        block_size (int, default 256): number of days in each block.
+        skiprows (int, default 1): number of header lines (the volatility row).
+
+    Output:
+        Yields arrays of up to block_size rows, one column per stock.
+    '''
+    with open(datafile) as f:
+        for line in itertools.islice(f, skiprows):
+            pass
+        while True:
+            lines = list(itertools.islice(f, block_size))
+            if not lines:
+                return
+            yield np.loadtxt(lines, ndmin=2)
+
+
+def iter_blocks(source, block_size=256):
+    '''
+    Yields the price data a block of days at a time.
+
+    Input:
+        source (ndarray or str): price data (e.g. a memory-mapped array), a .npy file
+            (memory-mapped), or a text data file (read a block at a time).
+        block_size (int, default 256): number of days in each block.
+
+    Output:
+        Yields arrays of up to block_size rows, one column per stock.
+    '''
+    if isinstance(source, str):
+        if not source.endswith('.npy'):
+            yield from iter_text_blocks(source, block_size)
+            return
+        source = np.load(source, mmap_mode='r')
+    for start in range(0, len(source), block_size):
+        # Only this block is read from a memory-mapped source
+        yield np.array(source[start:start + block_size], dtype=float)
+
+
+class BlockRollingSum:
+    '''
+    Sum of the last n values, for blocks of days. The running totals of the
+    last n days are carried from one block to the next, and the sums are exactly
+    those of trading.rolling.rolling_sum() on the whole data.
+
+    Input:
+        n (int): length of the window (in days).
+        divisor (int, default 1): the sums are divided by it before rounding.
+    '''
+    def __init__(self, n, divisor=1):
+        self.n = n
+        self.divisor = divisor
+        self.totals = None
+        self.nans = None
+
+    def update(self, block):
+        '''
+        Input:
+            block (ndarray): values of a block of days, one column per stock.
+
+        Output:
+            sums (ndarray): the sum of the last n values on each day of the block,
+                NaN for the days before the window is complete (or with a NaN inside).
+        '''
+        units, missing = rolling.to_units(block, self.n)
+        if self.totals is None:
+            # Running total before the first day
+            self.totals = np.zeros((1,) + units.shape[1:], dtype=np.int64)
+            self.nans = np.zeros((1,) + units.shape[1:], dtype=np.int64)
+        # Continue the running totals from the last day of the previous block
+        totals = np.concatenate([self.totals, self.totals[-1] + np.cumsum(units, axis=0)])
+        nans = np.concatenate([self.nans, self.nans[-1] + np.cumsum(missing, axis=0)])
+        # Row of today's total, and of the total n days before
+        today = len(self.totals) + np.arange(len(units))
+        before = today - self.n
+        valid = before >= 0
+        sums = np.full(units.shape, np.nan)
+        sums[valid] = (totals[today[valid]] - totals[before[valid]]) / (rolling.UNITS * self.divisor)
+        # Windows with a missing value have no sum
+        with_nans = nans[today] - nans[np.maximum(before, 0)] > 0
+        sums[with_nans & valid.reshape((-1,) + (1,) * (units.ndim - 1))] = np.nan
+        keep = max(self.n, 1)
+        self.totals = totals[-keep:]
+        self.nans = nans[-keep:]
+        return sums
+
+
+class BlockMovingAverage:
+    '''
+    n-day (possibly weighted) moving average, for blocks of days.
+    Gives the same values as trading.indicators.moving_average() on the whole data.
+
+    Input:
+        n (int, default 7): period of the moving average (in days).
+        weights (list, default []): weights of the days in the window, oldest first.
+    '''
+    def __init__(self, n=7, weights=[]):
+        self.n = n
+        self.weights = weights
+        self.sum = BlockRollingSum(n, divisor=n)
+        # Last n-1 days, for the weighted average
+        self.tail = None
+
+    def update(self, block):
+        '''
+        Input:
+            block (ndarray): prices of a block of days, one column per stock.
+
+        Output:
+            ma (ndarray): the moving average on each day of the block, NaN for the first n-1 days.
+        '''
+        if len(self.weights) == 0:
+            return self.sum.update(block)
+        window = block if self.tail is None else np.concatenate([self.tail, block])
+        ma = np.full(block.shape, np.nan)
+        if len(window) >= self.n:
+            values = rolling.rolling_weighted_sum(window, self.weights) / sum(self.weights)
+            ma[len(block) - len(values):] = values
+        self.tail = window[max(len(window) - (self.n - 1), 0):]
+        return ma
+
+
+class BlockOscillator:
+    '''
+    Stochastic or RSI oscillator with a period of n days, for blocks of days.
+    Gives the same values as trading.indicators.oscillator() on the whole data.
+
+    Input:
+        n (int, default 7): period of the oscillator (in days).
+        osc_type (str, default 'stochastic'): either 'stochastic' or 'RSI'.
+    '''
+    def __init__(self, n=7, osc_type='stochastic'):
+        self.n = n
+        self.osc_type = osc_type
+        self.day = 0
+        # Last n-1 prices (stochastic) or last price (RSI) of the previous blocks
+        self.tail = None
+        self.sum_up = BlockRollingSum(n - 1)
+        self.sum_down = BlockRollingSum(n - 1)
+        self.count_up = BlockRollingSum(n - 1)
+
+    def update(self, block):
+        '''
+        Input:
+            block (ndarray): prices of a block of days, one column per stock.
+
+        Output:
+            osc (ndarray): the oscillator level on each day of the block, 0 for the first n-1 days.
+        '''
+        window = block if self.tail is None else np.concatenate([self.tail, block])
+        osc = np.zeros(block.shape)
+        if self.osc_type == 'stochastic':
+            if len(window) >= self.n:
+                prices = window[self.n - 1:]
+                lows = rolling.rolling_min(window, self.n)
+                highs = rolling.rolling_max(window, self.n)
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    osc[len(block) - len(prices):] = (prices - lows) / (highs - lows)
+            self.tail = window[max(len(window) - (self.n - 1), 0):]
+        elif self.osc_type == 'RSI':
+            # Differences with the previous day, the very first day has none
+            delta = np.diff(window, axis=0)
+            rise = delta > 0
+            sum_up = self.sum_up.update(np.where(rise, delta, 0))
+            sum_down = self.sum_down.update(np.where(rise, 0, -delta))
+            count_up = self.count_up.update(rise.astype(float))
+            count_down = (self.n - 1) - count_up
+            with np.errstate(divide='ignore', invalid='ignore'):
+                aver_po = sum_up / count_up
+                aver_ne = sum_down / count_down
+                level = aver_po / (aver_po + aver_ne)
+            level = np.where(count_down == 0, 1, np.where(count_up == 0, 0, level))
+            osc[len(block) - len(level):] = level
+            self.tail = window[-1:]
+        # The first n-1 days of the data have no level
+        first = max(self.n - 1 - self.day, 0)
+        osc[:first] = 0
+        self.day += len(block)
+        return osc
+
+
+class BlockPrices:
+    '''
+    Rows of price data indexed by day, as the whole price array would be, so that
+    the functions of trading.process can buy and sell with a block of days only.
+
+    Input:
+        rows (ndarray): the price data of consecutive days (days x stocks).
+        first_day (int): the day of the first row.
+
+    Example:
+        >>> BlockPrices(sim_data[100:164], 100)[130, [0, 3]]  # same as sim_data[130, [0, 3]]
+    '''
+    def __init__(self, rows, first_day):
+        self.rows = rows
+        self.first_day = first_day
+
+    def __getitem__(self, key):
+        date, stocks = key
+        return self.rows[date - self.first_day, stocks]
+
+
+def stream_backtest(blocks, strategy_name, params, ledger_file, available_capital=5000, fees=20,
+                    portfolio=None):
+    '''
+    Runs a strategy on price data arriving a block of days at a time.
+
+    The indicators carry their windows from one block to the next and the trades
+    are written to the ledger file after each block, so the memory used depends
+    on the block size and the indicator periods, not on the number of days. The
+    trades are the same as those of the strategy run on the whole data.
+
+    Input:
+        blocks (iterable): blocks of days of price data, e.g. from iter_blocks().
+        strategy_name (str): 'crossing_averages' or 'momentum'
+        params (dict): parameters of the strategy, see trading.backtest.strategy_signals().
+        ledger_file (str or Ledger): path to the ledger file, or a Ledger. An in-memory
+            Ledger (without a file) keeps every trade, its memory is not bounded.
+        available_capital (float, default 5000): budget for each purchase
+        fees (float or CostModel, default 20): transaction fees (fixed amount per
+            transaction), or the cost model of the transactions
+        portfolio (Portfolio, default None): our current portfolio, an empty one if None.
+
+    Output:
+        portfolio (Portfolio): the portfolio at the end.
+
+    Example:
+        >>> blocks = iter_blocks('stock_data_5y.npy', block_size=250)
+        >>> portfolio = stream_backtest(blocks, 'crossing_averages', {'n': 200, 'm': 50},
+        ...                             'ledger_crossing_averages.txt')
+    '''
+    if ledger_file is None:
+        raise ValueError('stream_backtest needs a ledger file or a Ledger to keep the trades')
+    params = bt.strategy_params(strategy_name, params)
+    if strategy_name == 'crossing_averages':
+        fast = BlockMovingAverage(params['m'])
+        slow = BlockMovingAverage(params['n'])
+        # A crossing needs the averages 2 days later
+        lookahead = 2
+    elif strategy_name == 'momentum':
+        osc = BlockOscillator(params['n'], params['osc_type'])
+        last_buy = last_sell = None
+        # Transactions happen the day before the signal
+        lookahead = 1
+    else:
+        raise ValueError('stream_backtest does not run the ' + strategy_name + ' strategy')
+    ledger = ledger_file if isinstance(ledger_file, proc.Ledger) else proc.Ledger(ledger_file)
+    day = 0
+    held = None
+    for block in blocks:
+        block = np.asarray(block, dtype=float)
+        if portfolio is None:
+            portfolio = proc.Portfolio(block.shape[1])
+        if strategy_name == 'crossing_averages':
+            rows = (block, fast.update(block), slow.update(block))
+        else:
+            if last_buy is None:
+                last_buy = np.full(block.shape[1], -1)
+                last_sell = np.full(block.shape[1], -1)
+            signal_buy, signal_sell = bt.cooldown_signals(osc.update(block), params['buy_range'], params['sell_range'],
+                                                          params['cooldown'], last_buy, last_sell, day)
+            rows = (block, signal_buy, signal_sell)
+        # Days waiting for the next block come first
+        if held is not None:
+            rows = tuple(np.concatenate([old, new]) for old, new in zip(held, rows))
+        first_day = day + len(block) - len(rows[0])
+        if strategy_name == 'crossing_averages':
+            buy, sell = bt.crossing_signals(rows[1], rows[2])
+        else:
+            buy, sell = rows[1][1:], rows[2][1:]
+        ready = len(rows[0]) - lookahead
+        if ready > 0:
+            bt.run_signals(buy[:ready], sell[:ready], BlockPrices(rows[0], first_day),
+                           available_capital, fees, portfolio, ledger, first_day)
+        held = tuple(row[max(ready, 0):] for row in rows)
+        day += len(block)
+        # Emit the trades of this block
+        ledger.flush()
+    if ledger is not ledger_file:
+        ledger.close()
+    return portfolio
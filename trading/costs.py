@@ -0,0 +1,78 @@
+# Transaction cost models, applied to arrays of fills at once.
+import numpy as np
+
+
+class CostModel:
+    '''
+    Costs of buying and selling shares: fees, bid/ask spread and slippage.
+
+    Each fill pays fixed + max(minimum, rate * value of the shares) in fees. Buys
+    happen at the price plus half the spread plus the slippage, sells at the price
+    minus them. Every method works on whole arrays of fills, so the cost of many
+    stocks (or strategies) is computed at once. Other models can subclass CostModel
+    and redefine its methods.
+
+    Input:
+        fixed (float, default 0): fees per transaction.
+        rate (float, default 0): fees as a fraction of the value of the shares traded.
+        minimum (float, default 0): minimum of the proportional part of the fees.
+        spread (float, default 0): difference between the ask and bid prices,
+            as a fraction of the price.
+        slippage (float, default 0): move of the price against each fill,
+            as a fraction of the price.
+
+    Example:
+        Fees of 0.1% (at least 5) on every transaction, and a spread of 0.05%:
+            >>> costs = CostModel(rate=0.001, minimum=5, spread=0.0005)
+            >>> portfolio.buy_many(21, [0, 3, 7], 1000, sim_data, costs)
+    '''
+    def __init__(self, fixed=0.0, rate=0.0, minimum=0.0, spread=0.0, slippage=0.0):
+        self.fixed = fixed
+        self.rate = rate
+        self.minimum = minimum
+        self.spread = spread
+        self.slippage = slippage
+
+    def __repr__(self):
+        return ('CostModel(fixed=' + str(self.fixed) + ', rate=' + str(self.rate) + ', minimum=' + str(self.minimum)
+                + ', spread=' + str(self.spread) + ', slippage=' + str(self.slippage) + ')')
+
+    def buy_prices(self, prices):
+        '''
+        Returns the prices paid for a share, from the prices of the data.
+        '''
+        return prices * (1 + (self.spread / 2 + self.slippage))
+
+    def sell_prices(self, prices):
+        '''
+        Returns the prices received for a share, from the prices of the data.
+        '''
+        return prices * (1 - (self.spread / 2 + self.slippage))
+
+    def fees(self, values):
+        '''
+        Returns the fees of fills of the given values (shares times price).
+        '''
+        return self.fixed + np.maximum(self.minimum, self.rate * values)
+
+    def affordable(self, available_capital, prices):
+        '''
+        Returns the largest number of shares that can be bought at the given prices
+        (from buy_prices()) with available_capital, fees included. 0 when the
+        capital does not even cover the fees.
+        '''
+        number = (available_capital - self.fixed - self.minimum) // prices
+        if self.rate > 0:
+            # Above the minimum, the fees grow with the number of shares
+            number = np.minimum(number, (available_capital - self.fixed) // (prices * (1 + self.rate)))
+        return np.maximum(number, 0).astype(np.int64)
+
+
+def as_cost_model(fees):
+    '''
+    Returns the cost model for fees: a CostModel is used as it is, a number
+    is a fixed fee per transaction.
+    '''
+    if isinstance(fees, CostModel):
+        return fees
+    return CostModel(fixed=fees)
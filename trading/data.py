@@ -1,81 +1,213 @@
+import hashlib
+import os
 import numpy as np
+import trading.files as files
 
 
-def generate_stock_price(days, initial_price, volatility):
+def generate_stock_paths(days, initial_price, volatility, n_paths=1, seed=None):
+    '''
+    Generates daily closing share prices for several companies and several
+    simulated histories at once, with the same model as generate_stock_price().
+
+    Input:
+        days (int): number of days to simulate.
+        initial_price (list): initial share price of each stock.
+        volatility (list): volatility of each stock (same length as initial_price).
+        n_paths (int, default 1): number of independent price histories per stock.
+        seed (int, default None): seed for the random generator, for reproducible runs.
+
+    Output:
+        stock_prices (ndarray): array of shape (days, n_stocks, n_paths).
+            Prices are NaN from the first day a price drops to zero or below.
+
+    Example:
+        1000 histories of 5 years for 2 stocks:
+            >>> paths = generate_stock_paths(1825, [150, 250], [1.8, 3.2], n_paths=1000, seed=1)
+    '''
+    # Broadcast the stock parameters along the stock axis
+    initial_price = np.asarray(initial_price, dtype=float).reshape(1, -1, 1)
+    volatility = np.asarray(volatility, dtype=float).reshape(1, -1, 1)
+    n_stocks = initial_price.shape[1]
+    shape = (days, n_stocks, n_paths)
+    rng = np.random.default_rng(seed)
+    # Draw all the random normal increments at once, nothing happens on day 0
+    inc = rng.normal(0, 1, shape) * volatility**2
+    inc[0] = 0
+    # News happens with probability 0.01 on each day after day 0
+    news_today = rng.random((days - 1, n_stocks, n_paths)) < 0.01
+    day, stock, path = np.nonzero(news_today)
+    day += 1
+    # Draw the drift and the duration (3-14 days) for the news days only
+    drift = rng.normal(0, 4, len(day)) * volatility[0, stock, 0]
+    duration = rng.integers(3, 14, len(day))
+    # Mark the start and the end of each news window, news has a cumulative effect
+    # so the running sum of the marks gives the total drift on each day
+    marks = np.zeros((days + 1, n_stocks, n_paths))
+    np.add.at(marks, (day, stock, path), drift)
+    np.add.at(marks, (np.minimum(day + duration, days), stock, path), -drift)
+    total_drift = np.cumsum(marks[:days], axis=0)
+    # Each price is the previous price plus today's increment and drift
+    stock_prices = initial_price + np.cumsum(inc + total_drift, axis=0)
+    # Once a price drops to zero or below, the stock is gone for good
+    alive = np.logical_and.accumulate(stock_prices > 0, axis=0)
+    stock_prices[~alive] = np.nan
+    return stock_prices
+
+
+def generate_stock_price(days, initial_price, volatility, seed=None):
     '''
     Generates daily closing share prices for a company,
     for a given number of days.
+
+    Input:
+        days (int): number of days to simulate.
+        initial_price (float): initial share price.
+        volatility (float): volatility of the stock.
+        seed (int, default None): seed for the random generator.
+
+    Output:
+        stock_prices (ndarray): the share price each day, NaN once it drops to zero or below.
+    '''
+    # A single stock and a single path of the batched generator
+    return generate_stock_paths(days, [initial_price], [volatility], seed=seed)[:, 0, 0]
+
+
+def _as_list(values):
     '''
-    # Set stock_prices to be a zero array with length days
-    stock_prices = np.zeros(days)
-    # Set stock_prices in row 0 to be initial_price
-    stock_prices[0] = initial_price
-    # Set total_drift to be a zero array with length days
-    totalDrift = np.zeros(days)
-    # Set up the default_rng from Numpy
-    rng = np.random.default_rng()
-    # Loop over a range(1, days)
-    for day in range(1, days):
-        # Get the random normal increment
-        inc = rng.normal(0,volatility**2)
-        # Add stock_prices[day-1] to inc to get NewPriceToday
-        NewPriceToday = stock_prices[day-1]+inc
-        # Make a function for the news
-        def news(chance, volatility):
-            '''
-            Simulate the news with %chance
-            '''
-            # Choose whether there's news today
-            news_today = rng.choice([0,1], p=chance)
-            # The impact of news lasts 3-14 days
-            duration = rng.integers(3, 14)
-            if news_today:
-                # Calculate m and drift
-                # Extract from the normal distribution that conforms to (0, 2 ^ 2)
-                m = rng.normal(0,4)
-                drift = m * volatility
-                # Randomly choose the duration
-                final = np.zeros(duration)
-                for i in range(duration):
-                    # Impact list
-                    final[i] = drift
-                # Return result list
-                return final
+    Returns the input argument as a list, empty if it was not specified.
+    '''
+    if values is None:
+        return []
+    if np.isscalar(values):
+        return [] if values == 0 else [values]
+    return list(values)
+
+def _file_hash(path):
+    '''
+    Returns the SHA-1 digest of a file, as a hexadecimal string.
+    '''
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def cache_paths(datafile):
+    '''
+    Returns the paths of the binary cache of a data file.
+
+    Input:
+        datafile (str): path to the text data file.
+
+    Output:
+        price_file (str): .npy file with the price data.
+        meta_file (str): .npz file with the volatilities, the initial prices
+            and the mtime and hash of the text file.
+    '''
+    base = os.path.splitext(datafile)[0]
+    return base + '.npy', base + '.meta.npz'
+
+
+def convert_data(datafile='stock_data_5y.txt'):
+    '''
+    Converts a text data file to a binary cache next to it.
+
+    The first line of the text file holds the volatility of each stock,
+    the other lines hold the price of each stock every day.
+
+    Input:
+        datafile (str, default 'stock_data_5y.txt'): path to the text data file.
+
+    Output:
+        price_file (str): path to the .npy file with the price data.
+    '''
+    my_data = np.loadtxt(datafile)
+    price_file, meta_file = cache_paths(datafile)
+    files.replace_file(price_file, lambda f: np.save(f, my_data[1:]))
+    # The header row and the first day of prices are used to select columns,
+    # the metadata is written last so it never describes prices not written yet
+    files.replace_file(meta_file, lambda f: np.savez(f, volatility=my_data[0], initial_price=my_data[1],
+                                                 mtime=os.stat(datafile).st_mtime_ns, sha1=_file_hash(datafile)))
+    return price_file
+
+
+def load_data(datafile='stock_data_5y.txt'):
+    '''
+    Loads a data file through its binary cache, creating or refreshing the cache
+    if the text file changed since it was converted. When the cache cannot be
+    written (e.g. the folder of the data file is read-only), the text file is read.
+
+    Input:
+        datafile (str, default 'stock_data_5y.txt'): path to the text data file.
+
+    Output:
+        prices (ndarray): read-only price data (memory-mapped from the cache), one column per stock.
+        volatility (ndarray): volatility of each stock.
+        initial_price (ndarray): price of each stock on day 0.
+    '''
+    price_file, meta_file = cache_paths(datafile)
+    try:
+        if not (os.path.exists(price_file) and os.path.exists(meta_file)):
+            convert_data(datafile)
+        with np.load(meta_file) as saved:
+            meta = dict(saved)
+        mtime = os.stat(datafile).st_mtime_ns
+        # Only hash the file when its mtime differs from the one in the cache
+        if meta['mtime'] != mtime:
+            if meta['sha1'] != _file_hash(datafile):
+                convert_data(datafile)
+                with np.load(meta_file) as saved:
+                    meta = dict(saved)
             else:
-                # No news, no impact
-                return np.zeros(duration)
-        # Get the drift from the news
-        # Set probability for news occurrence 1:0.01,0:0.99 and call news()
-        d = news([0.99,0.01], volatility)
-        # Get the duration
-        duration = len(d)
-        # Add the drift to the next days
-        # News has a cumulative effect
-        # Only valid days are calculated
-        if day + duration <= days:
-            totalDrift[day:day+duration] += d
-        else:
-            totalDrift[day:days-1] += d[0:days-day-1]
-        # Add today's drift to today's price
-        NewPriceToday += totalDrift[day]
-        # Set stock_prices[day] to NewPriceToday or to NaN if it's negative
-        if NewPriceToday <= 0:
-            stock_prices[day] = np.nan
-        else:
-            stock_prices[day] = NewPriceToday
-    return stock_prices
+                # Same content, remember the new mtime to skip the hash next time
+                meta['mtime'] = mtime
+                try:
+                    files.replace_file(meta_file, lambda f: np.savez(f, **meta))
+                except OSError:
+                    # The cache is still valid, the file is hashed again next time
+                    pass
+    except OSError:
+        # No usable cache, read the text file
+        my_data = np.loadtxt(datafile)
+        prices = my_data[1:]
+        prices.setflags(write=False)
+        return prices, my_data[0], my_data[1]
+    prices = np.load(price_file, mmap_mode='r')
+    return prices, meta['volatility'], meta['initial_price']
 
-def get_data(method, initial_price = 0, volatility = 0,datafile = 'stock_data_5y.txt'):
+
+def nearest_columns(available, wanted):
+    '''
+    Finds, for each wanted value, the index of the closest available value.
+
+    Input:
+        available (ndarray): value for each column of the data.
+        wanted (list): the values to look for.
+
+    Output:
+        columns (ndarray): index of the closest column to each wanted value.
+    '''
+    # Distance from every wanted value to every column, closest column on each row
+    distance = np.abs(np.asarray(wanted, dtype=float)[:, None] - np.asarray(available)[None, :])
+    return np.argmin(distance, axis=1)
+
+
+def _format_list(values):
+    '''
+    Formats numbers as in the messages of get_data(), e.g. [200, 1.5].
+    '''
+    return '[' + ', '.join('{:g}'.format(value) for value in values) + ']'
+
+
+def get_data(method='read', initial_price = 0, volatility = 0,datafile = 'stock_data_5y.txt', seed=None):
     '''
     Generates or reads simulation data for one or more stocks over 5 years,
     given their initial share price and volatility.
 
     Input:
         method (str): either 'generate' or 'read' (default 'read').
-            If method is 'generate', use generate_stock_price() to generate
+            If method is 'generate', use generate_stock_paths() to generate
                 the data from scratch.
-            If method is 'read', use Numpy's loadtxt() to read the data
-                from the file stock_data_5y.txt.
+            If method is 'read', read the data of the file stock_data_5y.txt
+                through its binary cache (see load_data()).
 
         initial_price (list): list of initial prices for each stock (default None)
             If method is 'generate', use these initial prices to generate the data.
@@ -87,11 +219,18 @@ def get_data(method, initial_price = 0, volatility = 0,datafile = 'stock_data_5y
             If method is 'read', choose the column in stock_data_5y.txt with the closest
                 volatility to each value in the list, and display an appropriate message.
 
+        datafile (str, default 'stock_data_5y.txt'): path to the data file.
+
+        seed (int, default None): seed for the random generator if method is 'generate'.
+
         If no arguments are specified, read price data from the whole file.
 
     Output:
         sim_data (ndarray): NumPy array with N columns, containing the price data
             for the required N stocks each day over 5 years.
+            If method is 'read' and no column is chosen, the array is read-only
+            (memory-mapped from the cache): modifying it in place raises ValueError,
+            use np.array(sim_data) for a writable copy.
 
     Examples:
         Returns an array with 2 columns:
@@ -123,15 +262,34 @@ def get_data(method, initial_price = 0, volatility = 0,datafile = 'stock_data_5y
             >>> get_data()
     '''
     days = 1825
+    initial_price = _as_list(initial_price)
+    volatility = _as_list(volatility)
     if method == 'generate':
-        # User chooses to generate simulated data, call generate_stock_price(). Save results to sim_data
-        sim_data = generate_stock_price(days,initial_price,volatility)
+        # Both lists are needed to generate the data
+        if len(volatility) == 0 or len(volatility) < len(initial_price):
+            print('Please specify the volatility for each stock.')
+            return None
+        if len(initial_price) < len(volatility):
+            print('Please specify the initial price for each stock.')
+            return None
+        # User chooses to generate simulated data, all stocks are generated in one go
+        sim_data = generate_stock_paths(days, initial_price, volatility, seed=seed)[:, :, 0]
     elif method == 'read':
-        # User chooses to generate simulated data
-        # Use np.loadtxt read the data from textbook
-        # Because the first line is volatility, it is not read.
-        # And read to the number of days the user wants
-        my_data = np.loadtxt(datafile,skiprows=1)
+        # User chooses to read the data, through the binary cache of the text file
+        my_data, my_volatility, my_initial_price = load_data(datafile)
+        # Read to the number of days the user wants
         sim_data = my_data[0:days]
+        # Choose the closest columns, by initial price first
+        if len(initial_price) > 0:
+            columns = nearest_columns(my_initial_price, initial_price)
+        elif len(volatility) > 0:
+            columns = nearest_columns(my_volatility, volatility)
+        else:
+            return sim_data
+        print('Found data with initial prices ' + _format_list(my_initial_price[columns])
+              + ' and volatilities ' + _format_list(my_volatility[columns]) + '.')
+        if len(initial_price) > 0 and len(volatility) > 0:
+            print('Input argument volatility ignored.')
+        sim_data = sim_data[:, columns]
     # Return the result of the simulated data
     return sim_data
\ No newline at end of file
@@ -0,0 +1,26 @@
+# Writing files that other processes may be reading at the same time.
+import os
+import tempfile
+
+
+def replace_file(path, write):
+    '''
+    Writes a file atomically: write(f) fills a temporary file in the same folder,
+    which then replaces path. Readers see the old file or the new one, never a
+    partial file, and the temporary file is removed if writing fails.
+
+    Input:
+        path (str): path to the file to write.
+        write (function): called with the temporary file, opened in binary mode.
+
+    Example:
+        >>> replace_file('prices.npy', lambda f: np.save(f, prices))
+    '''
+    handle, temporary = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    try:
+        with os.fdopen(handle, 'wb') as f:
+            write(f)
+        os.replace(temporary, path)
+    except BaseException:
+        os.remove(temporary)
+        raise
@@ -0,0 +1,221 @@
+# Opt-in timers and counters around the hot paths of the trading package.
+import functools
+import importlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Functions to time: (module, function or Class.method, stage)
+TARGETS = [
+    ('trading.data', 'get_data', 'data'),
+    ('trading.data', 'generate_stock_paths', 'data'),
+    ('trading.data', 'load_data', 'data'),
+    ('trading.indicators', 'moving_average', 'indicators'),
+    ('trading.indicators', 'oscillator', 'indicators'),
+    ('trading.backtest', 'crossing_signals', 'signals'),
+    ('trading.backtest', 'threshold_signals', 'signals'),
+    ('trading.backtest', 'random_signals', 'signals'),
+    ('trading.backtest', 'run_signals', 'orders'),
+    ('trading.process', 'buy', 'orders'),
+    ('trading.process', 'sell', 'orders'),
+    ('trading.process', 'Portfolio.buy_many', 'orders'),
+    ('trading.process', 'Portfolio.sell_many', 'orders'),
+    ('trading.process', 'log_transaction', 'ledger'),
+    ('trading.process', 'Ledger.flush', 'ledger'),
+    ('trading.binary_ledger', 'BinaryLedger.flush', 'ledger'),
+    ('trading.strategy', 'random', 'strategy'),
+    ('trading.strategy', 'crossing_averages', 'strategy'),
+    ('trading.strategy', 'momentum', 'strategy'),
+]
+
+# Timed calls: (name, stage, start in ns, duration in ns, self duration in ns, thread id).
+# The self duration leaves out the timed calls made inside the call.
+_events = []
+# Stack of the timed calls in progress in each thread, with the time of their timed children
+_calls = threading.local()
+# Original functions replaced by a timed version: (owner, attribute) -> function
+_originals = {}
+_enabled = False
+
+
+def is_enabled():
+    '''
+    Tells whether the instrumentation is on.
+    '''
+    return _enabled
+
+
+@contextmanager
+def _timing(name, stage):
+    '''
+    Times a block of code, and records it with the time spent in it minus the
+    time of the timed calls nested inside.
+    '''
+    stack = getattr(_calls, 'stack', None)
+    if stack is None:
+        stack = _calls.stack = []
+    # Time of the nested timed calls, added by the children when they end
+    stack.append(0)
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter_ns() - start
+        children = stack.pop()
+        if stack:
+            stack[-1] += duration
+        _events.append((name, stage, start, duration, duration - children, threading.get_ident()))
+
+
+def _timed(function, name, stage):
+    '''
+    Returns function wrapped with a timer.
+    '''
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        with _timing(name, stage):
+            return function(*args, **kwargs)
+    return wrapper
+
+
+def enable(targets=TARGETS):
+    '''
+    Turns on the instrumentation: every target function is replaced, in its module
+    (or class), by a timed version. Nothing is timed, and nothing costs anything,
+    until this is called.
+
+    Input:
+        targets (list, default TARGETS): (module, function or Class.method, stage) to time.
+    '''
+    global _enabled
+    for module_name, attribute, stage in targets:
+        owner = importlib.import_module(module_name)
+        name = attribute
+        if '.' in attribute:
+            class_name, name = attribute.split('.')
+            owner = getattr(owner, class_name)
+        if (owner, name) in _originals:
+            continue
+        function = getattr(owner, name)
+        _originals[(owner, name)] = function
+        setattr(owner, name, _timed(function, module_name.split('.')[-1] + '.' + attribute, stage))
+    _enabled = True
+
+
+def disable():
+    '''
+    Turns off the instrumentation: the original functions are put back.
+    The recorded calls are kept until reset().
+    '''
+    global _enabled
+    for (owner, name), function in _originals.items():
+        setattr(owner, name, function)
+    _originals.clear()
+    _enabled = False
+
+
+def reset():
+    '''
+    Forgets the recorded calls.
+    '''
+    del _events[:]
+
+
+@contextmanager
+def timer(name, stage='user'):
+    '''
+    Times a block of code, if the instrumentation is on.
+
+    Example:
+        >>> with timer('load prices', 'data'):
+        ...     sim_data = get_data()
+    '''
+    if not _enabled:
+        yield
+        return
+    with _timing(name, stage):
+        yield
+
+
+@contextmanager
+def profile(name='run', trace_file=None):
+    '''
+    Profiles one block of code, e.g. one strategy run: turns the instrumentation
+    on for the block only, prints the summary table at the end, and writes a
+    Chrome trace if trace_file is given. If the instrumentation was already on,
+    the calls recorded before are kept and reported too.
+
+    Example:
+        >>> with profile('momentum', 'momentum_trace.json'):
+        ...     strategy.momentum(sim_data, 5000, 20, portfolio)
+    '''
+    was_enabled = _enabled
+    if not was_enabled:
+        reset()
+    enable()
+    try:
+        with timer(name, 'run'):
+            yield
+    finally:
+        if not was_enabled:
+            disable()
+        print(summary_table())
+        if trace_file is not None:
+            write_chrome_trace(trace_file)
+
+
+def summary():
+    '''
+    Aggregates the recorded calls by function.
+
+    Output:
+        rows (list): one dict per function with 'name', 'stage', 'calls',
+            'total' (seconds, nested timed calls included), 'self' (seconds,
+            nested timed calls left out), 'mean' (seconds) and 'max' (seconds),
+            by decreasing self time.
+    '''
+    totals = {}
+    for name, stage, start, duration, self_duration, thread in _events:
+        row = totals.setdefault(name, {'name': name, 'stage': stage, 'calls': 0, 'total': 0.0, 'self': 0.0, 'max': 0.0})
+        row['calls'] += 1
+        row['total'] += duration / 1e9
+        row['self'] += self_duration / 1e9
+        row['max'] = max(row['max'], duration / 1e9)
+    rows = sorted(totals.values(), key=lambda row: -row['self'])
+    for row in rows:
+        row['mean'] = row['total'] / row['calls']
+    return rows
+
+
+def summary_table():
+    '''
+    Formats summary() as a table, with the time of each stage.
+    The stage times add up self times, so each moment is counted in one stage
+    only and the stages add up to the time of the profiled run.
+    '''
+    lines = ['{:<34} {:<11} {:>8} {:>10} {:>10} {:>10} {:>10}'.format(
+        'function', 'stage', 'calls', 'total s', 'self s', 'mean ms', 'max ms')]
+    stages = {}
+    for row in summary():
+        stages[row['stage']] = stages.get(row['stage'], 0) + row['self']
+        lines.append('{:<34} {:<11} {:>8} {:>10.4f} {:>10.4f} {:>10.4f} {:>10.4f}'.format(
+            row['name'], row['stage'], row['calls'], row['total'], row['self'], row['mean'] * 1e3, row['max'] * 1e3))
+    lines.append('')
+    for stage, total in sorted(stages.items(), key=lambda item: -item[1]):
+        lines.append('{:<34} {:>10.4f} s'.format('stage ' + stage, total))
+    return '\n'.join(lines)
+
+
+def write_chrome_trace(path):
+    '''
+    Writes the recorded calls in the Chrome trace event format
+    (open it in chrome://tracing or https://ui.perfetto.dev).
+    '''
+    pid = os.getpid()
+    events = [{'name': name, 'cat': stage, 'ph': 'X', 'ts': start / 1e3, 'dur': duration / 1e3,
+               'pid': pid, 'tid': thread}
+              for name, stage, start, duration, self_duration, thread in _events]
+    with open(path, 'w') as f:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
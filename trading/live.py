@@ -0,0 +1,329 @@
+# Live trading loop on a simulated market feed, with asyncio.
+import asyncio
+import time
+from collections import namedtuple
+import numpy as np
+import trading.backtest as bt
+import trading.chunked as chunked
+import trading.data as data
+import trading.process as proc
+import trading.streaming as streaming
+
+# One day of prices from the feed, with the time it was published (perf_counter_ns)
+Tick = namedtuple('Tick', ['day', 'prices', 'time'])
+# Stocks to buy and sell for one strategy, with the tick that triggered them
+Order = namedtuple('Order', ['strategy', 'day', 'prices', 'buy', 'sell', 'tick_time'])
+
+
+class SimulatedFeed:
+    '''
+    Replays price data one day at a time to every subscriber.
+
+    Each subscriber gets its own bounded queue. When a queue is full, the feed
+    waits for that subscriber before publishing the next day (backpressure): the
+    feed goes as fast as the slowest consumer, and no day is dropped.
+
+    Input:
+        source (ndarray or str): price data, one row per day (generated paths with
+            shape (days, stocks, paths) are flattened to one column per path and stock),
+            or a text data file (read with trading.data.load_data()).
+        interval (float, default 0): seconds between two days, 0 to replay as fast as possible.
+
+    Example:
+        >>> feed = SimulatedFeed('stock_data_5y.txt', interval=0.01)
+        >>> queue = feed.subscribe()
+        >>> await feed.run()
+    '''
+    def __init__(self, source, interval=0.0):
+        if isinstance(source, str):
+            source = data.load_data(source)[0]
+        source = np.asarray(source, dtype=float)
+        self.prices = source.reshape(len(source), -1)
+        self.interval = interval
+        self.queues = []
+
+    def subscribe(self, maxsize=64):
+        '''
+        Returns a new queue receiving every Tick, then None at the end of the data.
+
+        Input:
+            maxsize (int, default 64): number of days the subscriber may lag behind.
+        '''
+        queue = asyncio.Queue(maxsize)
+        self.queues.append(queue)
+        return queue
+
+    async def run(self):
+        '''
+        Publishes every day of the data, then None.
+        '''
+        for day in range(len(self.prices)):
+            tick = Tick(day, self.prices[day], time.perf_counter_ns())
+            for queue in self.queues:
+                await queue.put(tick)
+            if self.interval > 0:
+                await asyncio.sleep(self.interval)
+        for queue in self.queues:
+            await queue.put(None)
+
+
+class CrossingConsumer:
+    '''
+    Crossing averages strategy, updated one day at a time.
+
+    A crossing is known two days after the averages were on the other side
+    (see trading.backtest.crossing_signals()); the order goes out on that day,
+    at that day's prices.
+
+    Input:
+        n (int): period of the slow moving average
+        m (int): period of the fast moving average
+    '''
+    def __init__(self, n, m):
+        self.slow = streaming.MovingAverage(n)
+        self.fast = streaming.MovingAverage(m)
+        # Averages of the last 2 days
+        self.history = []
+
+    def update(self, prices):
+        '''
+        Input:
+            prices (ndarray): today's prices, one per stock.
+
+        Output:
+            buy (ndarray): boolean array, True for the stocks to buy today.
+            sell (ndarray): boolean array, True for the stocks to sell today.
+        '''
+        fast, slow = self.fast.update(prices), self.slow.update(prices)
+        self.history.append((fast, slow))
+        if len(self.history) < 3:
+            return np.zeros(len(prices), dtype=bool), np.zeros(len(prices), dtype=bool)
+        (old_fast, old_slow), self.history = self.history[0], self.history[1:]
+        buy = (old_fast < old_slow) & (fast > slow)
+        sell = (old_fast > old_slow) & (fast < slow)
+        return buy, sell
+
+
+class MomentumConsumer:
+    '''
+    Momentum strategy, updated one day at a time.
+    The order goes out on the day of the signal, at that day's prices.
+
+    Input:
+        n (int): period of the oscillator (in days).
+        osc_type (str): either 'stochastic' or 'RSI'.
+        buy_range (tuple): buy when the level is strictly inside this band.
+        sell_range (tuple): sell when the level is strictly inside this band.
+        cooldown (int): minimum number of days between two signals.
+    '''
+    def __init__(self, n, osc_type, buy_range, sell_range, cooldown):
+        if osc_type == 'stochastic':
+            self.osc = streaming.Stochastic(n)
+        elif osc_type == 'RSI':
+            self.osc = streaming.RSI(n)
+        else:
+            raise ValueError('Unknown oscillator type: ' + str(osc_type))
+        self.buy_range = buy_range
+        self.sell_range = sell_range
+        self.cooldown = cooldown
+        self.day = 0
+        self.last_buy = None
+        self.last_sell = None
+
+    def update(self, prices):
+        '''
+        Input:
+            prices (ndarray): today's prices, one per stock.
+
+        Output:
+            buy (ndarray): boolean array, True for the stocks to buy today.
+            sell (ndarray): boolean array, True for the stocks to sell today.
+        '''
+        if self.last_buy is None:
+            self.last_buy = np.full(len(prices), -1)
+            self.last_sell = np.full(len(prices), -1)
+        level = np.asarray(self.osc.update(prices)).reshape(1, -1)
+        buy, sell = bt.cooldown_signals(level, self.buy_range, self.sell_range, self.cooldown,
+                                        self.last_buy, self.last_sell, self.day)
+        self.day += 1
+        return buy[0], sell[0]
+
+
+CONSUMERS = {'crossing_averages': CrossingConsumer, 'momentum': MomentumConsumer}
+
+
+async def consume(name, strategy, ticks, orders):
+    '''
+    Runs one strategy on the ticks of a feed, and sends its orders to the executor.
+
+    Input:
+        name (str): name of the strategy run, used in the orders.
+        strategy (CrossingConsumer or MomentumConsumer): the strategy state.
+        ticks (asyncio.Queue): ticks from SimulatedFeed.subscribe().
+        orders (asyncio.Queue): queue read by OrderExecutor.run().
+    '''
+    while True:
+        tick = await ticks.get()
+        if tick is None:
+            return
+        buy, sell = strategy.update(tick.prices)
+        if buy.any() or sell.any():
+            await orders.put(Order(name, tick.day, tick.prices, np.flatnonzero(buy),
+                                   np.flatnonzero(sell & ~buy), tick.time))
+
+
+class OrderExecutor:
+    '''
+    Fills the orders of several strategies, each with its own portfolio and ledger.
+
+    Waiting orders are taken together (up to batch_size) and the ledgers are
+    written once per batch, in a worker thread so the feed and the strategies
+    keep running meanwhile. The time from each tick to the fill of its orders
+    is recorded.
+
+    Input:
+        portfolios (dict): Portfolio of each strategy run, by name.
+        ledgers (dict): Ledger of each strategy run, by name.
+        available_capital (float, default 5000): budget for each purchase
+        fees (float, default 20): transaction fees
+        batch_size (int, default 64): number of orders filled together at most.
+    '''
+    def __init__(self, portfolios, ledgers, available_capital=5000, fees=20, batch_size=64):
+        self.portfolios = portfolios
+        self.ledgers = ledgers
+        self.available_capital = available_capital
+        self.fees = fees
+        self.batch_size = batch_size
+        self.latencies = []
+        self.batches = 0
+
+    def fill(self, order):
+        '''
+        Buys then sells the stocks of one order, at the prices of its day.
+        '''
+        prices = chunked.BlockPrices(order.prices[np.newaxis], order.day)
+        portfolio = self.portfolios[order.strategy]
+        ledger = self.ledgers[order.strategy]
+        if len(order.buy):
+            portfolio.buy_many(order.day, order.buy, self.available_capital, prices, self.fees, ledger)
+        if len(order.sell):
+            portfolio.sell_many(order.day, order.sell, prices, self.fees, ledger)
+
+    async def run(self, orders):
+        '''
+        Fills the orders from the queue until it gets None.
+        '''
+        done = False
+        while not done:
+            batch = [await orders.get()]
+            # Take every order already waiting, up to batch_size
+            while len(batch) < self.batch_size and not orders.empty():
+                batch.append(orders.get_nowait())
+            if batch[-1] is None:
+                done = True
+                batch.pop()
+            for order in batch:
+                self.fill(order)
+            now = time.perf_counter_ns()
+            self.latencies += [now - order.tick_time for order in batch]
+            self.batches += 1
+            # In the default thread pool (asyncio.to_thread() needs Python 3.9)
+            await asyncio.get_running_loop().run_in_executor(None, self.flush)
+
+    def flush(self):
+        '''
+        Writes the transactions of every ledger.
+        '''
+        for ledger in self.ledgers.values():
+            ledger.flush()
+
+
+def latency_percentiles(latencies, percentiles=(50, 90, 99, 100)):
+    '''
+    Summarizes tick-to-order latencies.
+
+    Input:
+        latencies (list): latencies in nanoseconds.
+        percentiles (tuple, default (50, 90, 99, 100)): percentiles to compute.
+
+    Output:
+        stats (dict): latency in milliseconds for each percentile, e.g. {'p50': 0.12},
+            and the number of orders ('orders').
+    '''
+    stats = {'orders': len(latencies)}
+    if latencies:
+        values = np.percentile(np.asarray(latencies) / 1e6, percentiles)
+        stats.update(('p' + str(q), float(value)) for q, value in zip(percentiles, values))
+    return stats
+
+
+async def _produce(feed, consumers, orders):
+    '''
+    Runs the feed and the strategies to the end of the data, then tells the executor.
+    '''
+    tasks = [asyncio.ensure_future(feed.run())] + [asyncio.ensure_future(consumer) for consumer in consumers]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        # A failed strategy leaves the feed waiting on its queue
+        for task in tasks:
+            task.cancel()
+    await orders.put(None)
+
+
+async def run_live(source, strategies, available_capital=5000, fees=20, interval=0.0,
+                   queue_size=64, batch_size=64, ledger_files=None):
+    '''
+    Runs several strategies on one simulated feed, with a shared order executor.
+
+    Input:
+        source (ndarray or str): price data or data file, see SimulatedFeed.
+        strategies (dict): (strategy name, parameters) of each strategy run, by name, e.g.
+            {'fast': ('crossing_averages', {'n': 50, 'm': 10}), 'osc': ('momentum', {'n': 7})}
+            The parameters are those of trading.backtest.strategy_signals().
+        available_capital (float, default 5000): budget for each purchase
+        fees (float, default 20): transaction fees
+        interval (float, default 0): seconds between two days of the feed.
+        queue_size (int, default 64): number of days a strategy may lag behind the feed,
+            also the number of orders waiting for the executor at most.
+        batch_size (int, default 64): number of orders filled together at most.
+        ledger_files (dict, default None): ledger file of each strategy run, by name;
+            the ledgers of the others stay in memory.
+
+    Output:
+        portfolios (dict): final Portfolio of each strategy run, by name.
+        ledgers (dict): Ledger of each strategy run, by name.
+        latency (dict): tick-to-order latency percentiles, see latency_percentiles().
+
+    Example:
+        >>> portfolios, ledgers, latency = asyncio.run(run_live('stock_data_5y.txt',
+        ...     {'crossing': ('crossing_averages', {}), 'momentum': ('momentum', {})}))
+    '''
+    ledger_files = ledger_files or {}
+    feed = SimulatedFeed(source, interval)
+    n_stocks = feed.prices.shape[1]
+    portfolios = {name: proc.Portfolio(n_stocks) for name in strategies}
+    ledgers = {name: proc.Ledger(ledger_files.get(name)) for name in strategies}
+    executor = OrderExecutor(portfolios, ledgers, available_capital, fees, batch_size)
+    orders = asyncio.Queue(queue_size)
+    # Check every strategy before creating any coroutine, none is left never awaited
+    running = {}
+    for name, (strategy_name, params) in strategies.items():
+        params = bt.strategy_params(strategy_name, params)
+        if strategy_name not in CONSUMERS:
+            raise ValueError('run_live does not run the ' + strategy_name + ' strategy')
+        running[name] = CONSUMERS[strategy_name](**params)
+    consumers = [consume(name, strategy, feed.subscribe(queue_size), orders) for name, strategy in running.items()]
+    tasks = [asyncio.ensure_future(_produce(feed, consumers, orders)),
+             asyncio.ensure_future(executor.run(orders))]
+    # If a strategy or the executor fails, nothing drains the queues any more:
+    # stop the other side instead of waiting on a full queue forever
+    done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+    for task in done:
+        task.result()
+    for ledger in ledgers.values():
+        ledger.close()
+    return portfolios, ledgers, latency_percentiles(executor.latencies)
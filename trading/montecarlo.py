@@ -0,0 +1,138 @@
+# Evaluate strategies on many simulated price histories.
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import trading.backtest as bt
+import trading.data as data
+import trading.performance as perf
+import trading.process as proc
+
+
+def run_paths(strategies, days, initial_price, volatility, n_paths, seed, available_capital=5000, fees=20):
+    '''
+    Generates n_paths price histories and runs every strategy on all of them at once.
+
+    The paths are laid side by side as the columns of one price matrix, so each
+    strategy computes its signals and runs the backtest engine a single time.
+    Transactions stay in memory.
+
+    Input:
+        strategies (dict): (strategy name, parameters) of each strategy run, by name, e.g.
+            {'slow': ('crossing_averages', {'n': 200, 'm': 50}), 'osc': ('momentum', {'n': 7})}
+            The parameters are those of trading.backtest.strategy_signals().
+        days (int): number of days.
+        initial_price (list): initial share price of each stock.
+        volatility (list): volatility of each stock.
+        n_paths (int): number of price histories.
+        seed (int or SeedSequence): seed for the prices and the random strategy.
+        available_capital (float, default 5000): budget for each purchase
+        fees (float, default 20): transaction fees
+
+    Output:
+        results (dict): for each strategy run, a tuple of two arrays with one value per path:
+            final profit or loss, and max drawdown amount (largest fall of the equity from
+            a peak, in money).
+    '''
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    # Separate random streams for the prices and for the random strategy
+    price_seed, strategy_seed = seed.spawn(2)
+    paths = data.generate_stock_paths(days, initial_price, volatility, n_paths, price_seed)
+    n_stocks = paths.shape[1]
+    stock_prices = paths.reshape(days, n_stocks * n_paths)
+    rng = np.random.default_rng(strategy_seed)
+    results = {}
+    for name, (strategy_name, params) in strategies.items():
+        buy, sell = bt.strategy_signals(strategy_name, stock_prices, params, n_paths=n_paths, rng=rng)
+        ledger = proc.Ledger()
+        bt.run_signals(buy, sell, stock_prices, available_capital, fees, np.zeros(stock_prices.shape[1]), ledger)
+        # Value of each path each day: sum over its stocks
+        equity = perf.stock_equity(ledger, stock_prices).reshape(days, n_stocks, n_paths).sum(axis=1)
+        drawdown = np.maximum.accumulate(equity, axis=0) - equity
+        results[name] = (equity[-1], drawdown.max(axis=0))
+    return results
+
+
+def _run_chunk(task):
+    '''
+    Worker task: runs one chunk of paths.
+    '''
+    return run_paths(*task)
+
+
+def iter_monte_carlo(strategies, n_paths, initial_price, volatility, days=1825, chunk=500,
+                     seed=None, workers=0, available_capital=5000, fees=20):
+    '''
+    Runs strategies on n_paths simulated price histories, chunk paths at a time,
+    and yields the results of each chunk as soon as it is ready.
+
+    Only one chunk of prices per process is in memory at any time.
+
+    Input:
+        strategies (dict): (strategy name, parameters) of each strategy run, by name,
+            see run_paths().
+        n_paths (int): number of price histories.
+        initial_price (list): initial share price of each stock.
+        volatility (list): volatility of each stock.
+        days (int, default 1825): number of days.
+        chunk (int, default 500): number of paths run together.
+        seed (int, default None): seed for reproducible runs.
+        workers (int, default 0): number of worker processes, 0 to run in this process,
+            None for os.cpu_count().
+        available_capital (float, default 5000): budget for each purchase
+        fees (float, default 20): transaction fees
+
+    Output:
+        Yields the output of run_paths() for each chunk, in order.
+    '''
+    sizes = [min(chunk, n_paths - start) for start in range(0, n_paths, chunk)]
+    # Independent random streams for every chunk
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(strategies, days, initial_price, volatility, size, chunk_seed, available_capital, fees)
+             for size, chunk_seed in zip(sizes, seeds)]
+    if workers == 0:
+        for task in tasks:
+            yield _run_chunk(task)
+        return
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        yield from pool.map(_run_chunk, tasks)
+
+
+def monte_carlo(strategies, n_paths, initial_price, volatility, days=1825, chunk=500, seed=None,
+                workers=0, available_capital=5000, fees=20, quantiles=(0.05, 0.25, 0.5, 0.75, 0.95)):
+    '''
+    Evaluates strategies on the distribution of their outcomes over simulated price histories.
+
+    Input:
+        strategies (dict): (strategy name, parameters) of each strategy run, by name,
+            see run_paths().
+        quantiles (tuple, default (0.05, 0.25, 0.5, 0.75, 0.95)): quantiles to report.
+        Other inputs: see iter_monte_carlo().
+
+    Output:
+        results (dict): for each strategy run, a dict with the arrays 'pnl' and 'max_drawdown_amount'
+            (one value per path, see run_paths()) and their quantiles 'pnl_quantiles' and
+            'drawdown_quantiles'.
+
+    Example:
+        >>> results = monte_carlo({'random': ('random', {}),
+        ...                        'crossing': ('crossing_averages', {'n': 200, 'm': 50}),
+        ...                        'momentum': ('momentum', {'n': 7})}, 10000, [150, 250], [1.8, 3.2], seed=1)
+        >>> results['momentum']['pnl_quantiles']
+    '''
+    # Only one value per path and strategy is kept from each chunk
+    pnl = {name: np.zeros(n_paths) for name in strategies}
+    drawdown = {name: np.zeros(n_paths) for name in strategies}
+    start = 0
+    for chunk_results in iter_monte_carlo(strategies, n_paths, initial_price, volatility, days, chunk,
+                                          seed, workers, available_capital, fees):
+        for name, (chunk_pnl, chunk_drawdown) in chunk_results.items():
+            pnl[name][start:start + len(chunk_pnl)] = chunk_pnl
+            drawdown[name][start:start + len(chunk_pnl)] = chunk_drawdown
+        start += len(chunk_pnl)
+    results = {}
+    for name in strategies:
+        results[name] = {'pnl': pnl[name], 'max_drawdown_amount': drawdown[name],
+                         'pnl_quantiles': np.quantile(pnl[name], quantiles),
+                         'drawdown_quantiles': np.quantile(drawdown[name], quantiles)}
+    return results
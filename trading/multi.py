@@ -0,0 +1,115 @@
+# Run several strategies side by side in a single pass over the data.
+import numpy as np
+import trading.backtest as bt
+import trading.costs as costs
+import trading.indicators as indi
+import trading.performance as perf
+import trading.process as proc
+
+
+class _SharedIndicators:
+    '''
+    Indicators computed once, and given to every strategy using them.
+    '''
+    def __init__(self, indicators):
+        self.indicators = indicators
+        self.results = {}
+
+    def _get(self, function, stock_prices, params):
+        key = (function,) + tuple(sorted(params.items()))
+        if key not in self.results:
+            self.results[key] = getattr(self.indicators, function)(stock_prices, **params)
+        return self.results[key]
+
+    def moving_average(self, stock_prices, **params):
+        return self._get('moving_average', stock_prices, params)
+
+    def oscillator(self, stock_prices, **params):
+        return self._get('oscillator', stock_prices, params)
+
+
+def run_strategies(strategies, stock_prices, available_capital=5000, fees=20, initial_capital=None, cache=None):
+    '''
+    Runs several strategies at once, each with its own portfolio and cash.
+
+    Indicators used by several strategies are computed once. The positions of
+    all the strategies are a (strategies x stocks) array, and the days are walked
+    through once for all of them: every strategy trades as if it ran alone from
+    an empty portfolio (as trading.backtest.run_signals() does), and no strategy
+    sees the shares of another.
+
+    Input:
+        strategies (dict): (strategy name, parameters) of each strategy run, by name, e.g.
+            {'random': ('random', {'seed': 1}), 'crossing': ('crossing_averages', {'n': 200, 'm': 50})}
+            The parameters are those of trading.backtest.strategy_signals(), and may
+            also set the 'available_capital' of a strategy run.
+        stock_prices (ndarray): the stock price data
+        available_capital (float, default 5000): budget for each purchase
+        fees (float or CostModel, default 20): transaction fees (fixed amount per transaction),
+            or the cost model of the transactions
+        initial_capital (float, default None): see trading.performance.ledger_stats().
+        cache (IndicatorCache, default None): cache for the indicators
+
+    Output:
+        equity (ndarray): one row per strategy run with its value each day.
+        stats (ndarray): structured array with one row per strategy run, with the
+            fields of trading.performance.compare_ledgers().
+        shares (ndarray): shares of each stock held at the end (strategies x stocks).
+        ledgers (dict): in-memory Ledger with the transactions of each strategy run, by name.
+
+    Example:
+        >>> equity, stats, shares, ledgers = run_strategies(
+        ...     {'random': ('random', {}),
+        ...      'crossing': ('crossing_averages', {'n': 200, 'm': 50}),
+        ...      'momentum': ('momentum', {'n': 7, 'osc_type': 'RSI'})}, sim_data)
+        >>> stats[['name', 'pnl', 'sharpe']]
+    '''
+    names = list(strategies)
+    shared = _SharedIndicators(indi if cache is None else cache)
+    buys, sells = [], []
+    for name in names:
+        strategy_name, params = strategies[name]
+        params = {key: value for key, value in params.items() if key != 'available_capital'}
+        buy, sell = bt.strategy_signals(strategy_name, stock_prices, params, shared)
+        buys.append(buy)
+        sells.append(sell)
+    # Signals of every strategy for each day (days x strategies x stocks)
+    buy = np.stack(buys, axis=1)
+    sell = np.stack(sells, axis=1) & ~buy
+    capital = np.array([strategies[name][1].get('available_capital', available_capital) for name in names], dtype=float)
+    model = costs.as_cost_model(fees)
+    days, n_stocks = stock_prices.shape
+    shares = np.zeros((len(names), n_stocks), dtype=np.int64)
+    cash = np.zeros(len(names))
+    equity = np.zeros((len(names), days))
+    ledgers = {name: proc.Ledger() for name in names}
+    # Stocks without a price are worth nothing
+    values = np.where(np.isnan(stock_prices), 0, stock_prices)
+    last = 0
+    # Skip the days without any signal
+    for day in np.nonzero((buy | sell).any(axis=(1, 2)))[0]:
+        # The positions have not changed since the last transactions
+        equity[:, last:day] = cash[:, np.newaxis] + shares @ values[last:day].T
+        prices = stock_prices[day]
+        missing = np.isnan(prices)
+        # Buy every stock with a signal (and a price today), as Portfolio.buy_many() does
+        to_buy = buy[day] & ~missing
+        number, spent, buy_fees = proc.buy_fills(to_buy, capital[:, np.newaxis], prices, model)
+        shares += number
+        cash += spent.sum(axis=1)
+        # Then sell all the shares of every stock with a signal, as Portfolio.sell_many() does
+        to_sell = sell[day] & ~missing & (shares > 0)
+        sold = np.where(to_sell, shares, 0)
+        earned, sell_fees = proc.sell_fills(sold, prices, model)
+        shares -= sold
+        cash += earned.sum(axis=1)
+        for k in np.nonzero(to_buy.any(axis=1) | to_sell.any(axis=1))[0]:
+            stocks = np.nonzero(number[k] > 0)[0]
+            ledgers[names[k]].record_many('buy', day, stocks, number[k, stocks], spent[k, stocks], buy_fees[k, stocks])
+            stocks = np.nonzero(to_sell[k])[0]
+            ledgers[names[k]].record_many('sell', day, stocks, sold[k, stocks], earned[k, stocks], sell_fees[k, stocks])
+        last = day
+    equity[:, last:] = cash[:, np.newaxis] + shares @ values[last:].T
+    rows = [(name,) + tuple(perf.curve_stats(equity[k], ledgers[name], initial_capital).values())
+            for k, name in enumerate(names)]
+    return equity, np.array(rows, dtype=perf.STATS_FIELDS), shares, ledgers
@@ -1,41 +1,247 @@
 # Evaluate performance.
 import numpy as np
-import trading.data
-import trading.process
-import trading.strategy
-def read_ledger(duration,ledger_file):
+import trading.process as proc
+import trading.binary_ledger as binary
+
+# Days of data per year, to annualise the Sharpe ratio: the price data has
+# a price every day (1825 days for 5 years)
+PERIODS_PER_YEAR = 365
+
+# Fields of the statistics of several strategies, see compare_ledgers()
+STATS_FIELDS = [('name', 'U32'), ('trades', np.int64), ('pnl', float), ('total_return', float),
+                ('max_drawdown', float), ('sharpe', float), ('turnover', float), ('win_rate', float)]
+
+
+def read_transactions(ledger_file):
+    '''
+    Reads all the transactions of a ledger in one pass.
+
+    Input:
+        ledger_file (str, Ledger or ndarray): path to a ledger file (text or binary),
+            a Ledger, or transactions already read.
+
+    Output:
+        transactions (ndarray): one record per transaction, with proc.TRANSACTION_DTYPE.
+            Fees are not written in ledger files, they are NaN when read from a file.
+    '''
+    if isinstance(ledger_file, np.ndarray):
+        return ledger_file
+    if isinstance(ledger_file, proc.Ledger):
+        if ledger_file.ledger_file is None:
+            return ledger_file.to_array()
+        # Write out the buffer, then read the whole file
+        ledger_file.flush()
+        ledger_file = ledger_file.ledger_file
+    if binary.is_binary_ledger(ledger_file):
+        return binary.read_binary(ledger_file)
+    with open(ledger_file, 'r') as f:
+        # Split every line once, then convert whole columns
+        rows = [line.split(',') for line in f.read().splitlines() if line]
+    transactions = np.zeros(len(rows), dtype=proc.TRANSACTION_DTYPE)
+    if len(rows) == 0:
+        return transactions
+    transaction_type, date, stock, shares, amount = zip(*rows)
+    transactions['type'] = np.array(transaction_type) == 'sell'
+    transactions['date'] = np.array(date).astype(np.int64)
+    transactions['stock'] = np.array(stock).astype(np.int64)
+    transactions['shares'] = np.array(shares).astype(float)
+    transactions['amount'] = np.array(amount).astype(float)
+    transactions['fees'] = np.nan
+    return transactions
+
+
+def cash_curve(ledger_file, duration):
+    '''
+    Computes the cash spent and earned up to each day.
+
+    Input:
+        ledger_file (str, Ledger or ndarray): the transactions, see read_transactions().
+        duration (int): number of days.
+
+    Output:
+        cash (ndarray): the total amount earned (positive) or spent (negative) up to each day.
+    '''
+    transactions = read_transactions(ledger_file)
+    return np.cumsum(np.bincount(transactions['date'], weights=transactions['amount'], minlength=duration)[:duration])
+
+
+def read_ledger(duration, ledger_file, initial_ledger=None):
     '''
     Reads and reports useful information from ledger_file.
+
+    Input:
+        duration (int): number of days.
+        ledger_file (str, Ledger or ndarray): the transactions of the strategy.
+        initial_ledger (str, default None): ledger of the initial portfolio
+            (e.g. 'ledger.txt' written by create_portfolio()), added to the cash.
+
+    Output:
+        current_currency (ndarray): the cash earned (positive) or spent (negative) up to each day.
     '''
-    current_currency = np.zeros(duration)
-    f = open(ledger_file,'r')
-    fl = open("ledger.txt",'r')
-    read_init = fl.readlines()
-    income = []
-    spent = []
-    earend = []
-    read = f.readlines()
-    for item in read:
-        if float(item.split(',')[4]) > 0:
-            earend.append(float(item.split(',')[4]))
-        else:
-            spent.append(float(item.split(',')[4]))
-        income.append(float(item.split(',')[4]))
-
-    print("the total number of transactions performed:",len(read))
-    print("the overall profit or loss over 5 years:",sum(income))
-    print("spent:",sum(spent))
-    print("earned:",sum(earend))
-
-    in_out = np.zeros(duration)
-    for item in read_init:
-        in_out[int(item.split(',')[1])] += float(item.split(',')[4])
-    current_currency[0] = in_out[0]
-    for item in read:
-        in_out[int(item.split(',')[1])] += float(item.split(',')[4])
-    for i in range(1,duration):
-        current_currency[i] = current_currency[i-1] + in_out[i]
-    fl.close()
-    f.close()
+    transactions = read_transactions(ledger_file)
+    amount = transactions['amount']
+    print("the total number of transactions performed:",len(transactions))
+    print("the overall profit or loss over 5 years:",amount.sum())
+    print("spent:",amount[amount <= 0].sum())
+    print("earned:",amount[amount > 0].sum())
+    current_currency = cash_curve(transactions, duration)
+    if initial_ledger is not None:
+        current_currency += cash_curve(initial_ledger, duration)
     return current_currency
 
+
+def stock_equity(ledger, stock_prices):
+    '''
+    Computes the value of a strategy in each stock each day: cash from the
+    transactions of the stock plus its shares held, valued at the price of the day.
+
+    Input:
+        ledger (str, Ledger or ndarray): the transactions, see read_transactions().
+        stock_prices (ndarray): the stock price data used by the strategy.
+
+    Output:
+        equity (ndarray): one column per stock with its value each day.
+            A stock without a price (NaN) is worth nothing.
+    '''
+    transactions = read_transactions(ledger)
+    days, stocks = stock_prices.shape
+    where = (transactions['date'], transactions['stock'])
+    # Cash and shares bought (positive) or sold (negative) each day, accumulated over time
+    cash = np.zeros((days, stocks))
+    np.add.at(cash, where, transactions['amount'])
+    moves = np.where(transactions['type'] == 0, transactions['shares'], -transactions['shares'])
+    holdings = np.zeros((days, stocks))
+    np.add.at(holdings, where, moves)
+    prices = np.where(np.isnan(stock_prices), 0, stock_prices)
+    return np.cumsum(cash, axis=0) + np.cumsum(holdings, axis=0) * prices
+
+
+def equity_curve(ledger, stock_prices):
+    '''
+    Computes the value of a strategy each day: cash from the transactions
+    plus the shares held, valued at the price of the day.
+
+    Input:
+        ledger (str, Ledger or ndarray): the transactions, see read_transactions().
+        stock_prices (ndarray): the stock price data used by the strategy.
+
+    Output:
+        equity (ndarray): the value of the strategy each day.
+            A stock without a price (NaN) is worth nothing.
+    '''
+    return stock_equity(ledger, stock_prices).sum(axis=1)
+
+
+def win_rate(ledger):
+    '''
+    Fraction of the sales that earned more than the purchases of the same stock
+    since the previous sale.
+
+    Input:
+        ledger (str, Ledger or ndarray): the transactions, see read_transactions().
+
+    Output:
+        rate (float): between 0 and 1, NaN if no purchase was ever sold.
+    '''
+    transactions = read_transactions(ledger)
+    # Group the transactions by stock, in time order
+    order = np.lexsort((np.arange(len(transactions)), transactions['date'], transactions['stock']))
+    stock = transactions['stock'][order]
+    amount = transactions['amount'][order]
+    sold = transactions['type'][order] == 1
+    spent = np.concatenate([[0], np.cumsum(np.where(sold, 0, -amount))])
+    # A round trip starts with a new stock, or right after a sale
+    start = np.ones(len(order), dtype=bool)
+    start[1:] = (stock[1:] != stock[:-1]) | sold[:-1]
+    first = np.maximum.accumulate(np.where(start, np.arange(len(order)), 0))
+    # Cost of the shares sold: everything spent on the stock since the start of the round trip
+    cost = spent[np.arange(len(order)) + 1] - spent[first]
+    trips = sold & (cost > 0)
+    if not trips.any():
+        return np.nan
+    return np.mean(amount[trips] > cost[trips])
+
+
+def ledger_stats(ledger, stock_prices, initial_capital=None, periods_per_year=PERIODS_PER_YEAR):
+    '''
+    Computes the main statistics of a strategy.
+
+    Input:
+        ledger (str, Ledger or ndarray): the transactions, see read_transactions().
+        stock_prices (ndarray): the stock price data used by the strategy.
+        initial_capital (float, default None): money available at the start.
+            If None, the largest amount of cash the strategy ever had spent.
+        periods_per_year (int, default PERIODS_PER_YEAR): number of days of data per year,
+            to annualise the Sharpe ratio (e.g. 252 for data with trading days only).
+
+    Output:
+        stats (dict): 'trades', 'pnl' (final profit or loss), 'total_return',
+            'max_drawdown' (largest fall from a peak, as a fraction of the peak),
+            'sharpe' (annualised, from daily returns), 'turnover' (money traded
+            over the capital) and 'win_rate'.
+    '''
+    transactions = read_transactions(ledger)
+    return curve_stats(equity_curve(transactions, stock_prices), transactions, initial_capital, periods_per_year)
+
+
+def curve_stats(equity, ledger, initial_capital=None, periods_per_year=PERIODS_PER_YEAR):
+    '''
+    Computes the statistics of ledger_stats() from an equity curve already known.
+
+    Input:
+        equity (ndarray): the value of the strategy each day, see equity_curve().
+        ledger (str, Ledger or ndarray): the transactions, see read_transactions().
+        initial_capital (float, default None): see ledger_stats().
+        periods_per_year (int, default PERIODS_PER_YEAR): see ledger_stats().
+
+    Output:
+        stats (dict): see ledger_stats().
+    '''
+    transactions = read_transactions(ledger)
+    if initial_capital is None:
+        initial_capital = max(-cash_curve(transactions, len(equity)).min(), 0)
+    # Value of the account, starting from the initial capital
+    value = initial_capital + equity
+    with np.errstate(divide='ignore', invalid='ignore'):
+        peak = np.maximum.accumulate(value)
+        returns = np.diff(value) / value[:-1]
+        stats = {
+            'trades': len(transactions),
+            'pnl': equity[-1],
+            'total_return': equity[-1] / initial_capital,
+            'max_drawdown': np.max((peak - value) / peak),
+            'sharpe': np.mean(returns) / np.std(returns) * np.sqrt(periods_per_year),
+            'turnover': np.abs(transactions['amount']).sum() / initial_capital,
+            'win_rate': win_rate(transactions),
+        }
+    return stats
+
+
+def compare_ledgers(ledgers, stock_prices, initial_capital=None, periods_per_year=PERIODS_PER_YEAR):
+    '''
+    Computes the equity curves and the statistics of several strategies.
+
+    Input:
+        ledgers (dict): ledger of each strategy (path, Ledger or transactions), by name.
+        stock_prices (ndarray): the stock price data used by the strategies.
+        initial_capital (float, default None): see ledger_stats().
+        periods_per_year (int, default PERIODS_PER_YEAR): see ledger_stats().
+
+    Output:
+        equity (ndarray): one row per strategy with its value each day.
+        stats (ndarray): structured array with one row per strategy,
+            with a 'name' field and the fields of ledger_stats().
+
+    Example:
+        >>> equity, stats = compare_ledgers({'random': 'ledger_random.txt',
+        ...                                  'crossing': 'ledger_crossing_averages.txt',
+        ...                                  'momentum': 'ledger_momentum.txt'}, sim_data)
+    '''
+    names = list(ledgers)
+    equity = np.zeros((len(names), len(stock_prices)))
+    rows = []
+    for i, name in enumerate(names):
+        transactions = read_transactions(ledgers[name])
+        equity[i] = equity_curve(transactions, stock_prices)
+        rows.append((name,) + tuple(curve_stats(equity[i], transactions, initial_capital, periods_per_year).values()))
+    return equity, np.array(rows, dtype=STATS_FIELDS)
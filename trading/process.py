@@ -1,5 +1,401 @@
 # Functions to process transactions.
 import numpy as np
+import trading.costs as costs
+
+# Codes of the transaction types in the ledger buffers
+TRANSACTION_TYPES = ('buy', 'sell')
+
+# One transaction as a record of NumPy arrays, fees are NaN when unknown
+TRANSACTION_DTYPE = np.dtype([('type', np.int8), ('date', np.int64), ('stock', np.int64),
+                              ('shares', np.float64), ('amount', np.float64), ('fees', np.float64)])
+
+
+def format_transaction(transaction_type, date, stock, number_of_shares, amount):
+    '''
+    Returns the line recording a transaction in a ledger file.
+
+    Input:
+        transaction_type (str): 'buy' or 'sell'
+        date (int): the date of the transaction (nb of days since day 0)
+        stock (int): the stock we buy or sell
+        number_of_shares (float): the number of shares bought or sold
+        amount (float): the money spent (negative) or earned (positive), including fees
+
+    Output:
+        line (str): comma-separated fields, ending with a newline.
+
+    Example:
+        >>> format_transaction('buy', 5, 2, 10, -1050)
+        'buy,5,2,10.0,-1050.0\\n'
+    '''
+    return transaction_type+','+str(int(date))+','+str(int(stock))+','+str(float(number_of_shares))+','+str(float(amount))+'\n'
+
+
+class Ledger:
+    '''
+    Collects transactions in memory and writes them to a ledger file in batches.
+
+    The transactions are kept in preallocated NumPy columns (date, stock, shares,
+    amount, fees, type code). When the buffer is full it is written to ledger_file
+    in one go, and it is written out again when the ledger is closed or leaves a
+    with block. Without a ledger_file, nothing is written and the buffer grows
+    to keep every transaction.
+
+    Input:
+        ledger_file (str, default None): path to the ledger file, the lines are appended
+            in the same format as log_transaction().
+        capacity (int, default 4096): number of transactions kept before writing to disk.
+
+    Example:
+        >>> with Ledger('ledger_momentum.txt') as ledger:
+        ...     buy(21, 7, 1000, sim_data, 30, portfolio, ledger)
+    '''
+    def __init__(self, ledger_file=None, capacity=4096):
+        self.ledger_file = ledger_file
+        self.capacity = capacity
+        # Number of transactions in the buffer, and in total
+        self.size = 0
+        self.count = 0
+        self.date = np.zeros(capacity, dtype=np.int64)
+        self.stock = np.zeros(capacity, dtype=np.int64)
+        self.shares = np.zeros(capacity)
+        self.amount = np.zeros(capacity)
+        self.fees = np.zeros(capacity)
+        self.type = np.zeros(capacity, dtype=np.int8)
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _reserve(self, number):
+        '''
+        Makes room in the buffer for number more transactions.
+        '''
+        if self.size + number <= self.capacity:
+            return
+        if self.ledger_file is not None:
+            self.flush()
+            if number <= self.capacity:
+                return
+        # In-memory ledgers (or very large batches) need a bigger buffer
+        capacity = max(2 * self.capacity, self.size + number)
+        for name in ('date', 'stock', 'shares', 'amount', 'fees', 'type'):
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            setattr(self, name, grown)
+        self.capacity = capacity
+
+    def record(self, transaction_type, date, stock, number_of_shares, amount, fees):
+        '''
+        Records one transaction, same arguments as log_transaction().
+        '''
+        self._reserve(1)
+        i = self.size
+        self.date[i] = date
+        self.stock[i] = stock
+        self.shares[i] = number_of_shares
+        self.amount[i] = amount
+        self.fees[i] = fees
+        self.type[i] = TRANSACTION_TYPES.index(transaction_type)
+        self.size += 1
+        self.count += 1
+
+    def record_many(self, transaction_type, date, stocks, numbers_of_shares, amounts, fees):
+        '''
+        Records transactions of the same type for several stocks at once.
+
+        Input:
+            transaction_type (str): 'buy' or 'sell'
+            date (int or ndarray): the date of the transactions
+            stocks (ndarray): the stocks we buy or sell
+            numbers_of_shares (ndarray): the number of shares for each stock
+            amounts (ndarray): the money spent or earned for each stock
+            fees (float or ndarray): the fees paid for each transaction
+        '''
+        number = len(stocks)
+        self._reserve(number)
+        i = self.size
+        self.date[i:i + number] = date
+        self.stock[i:i + number] = stocks
+        self.shares[i:i + number] = numbers_of_shares
+        self.amount[i:i + number] = amounts
+        self.fees[i:i + number] = fees
+        self.type[i:i + number] = TRANSACTION_TYPES.index(transaction_type)
+        self.size += number
+        self.count += number
+
+    def flush(self):
+        '''
+        Appends the buffered transactions to ledger_file and empties the buffer.
+        Does nothing for an in-memory ledger.
+        '''
+        if self.ledger_file is None or self.size == 0:
+            return
+        n = self.size
+        # Build all the lines first, then write them with a single call
+        lines = map(format_transaction,
+                    [TRANSACTION_TYPES[code] for code in self.type[:n].tolist()],
+                    self.date[:n].tolist(), self.stock[:n].tolist(),
+                    self.shares[:n].tolist(), self.amount[:n].tolist())
+        with open(self.ledger_file, 'a+') as f:
+            f.write(''.join(lines))
+        self.size = 0
+
+    def to_array(self):
+        '''
+        Returns the transactions in the buffer as an array with TRANSACTION_DTYPE.
+        For an in-memory ledger these are all the transactions.
+        '''
+        transactions = np.zeros(self.size, dtype=TRANSACTION_DTYPE)
+        for name in TRANSACTION_DTYPE.names:
+            transactions[name] = getattr(self, name)[:self.size]
+        return transactions
+
+    def close(self):
+        '''
+        Writes out the remaining transactions.
+        '''
+        self.flush()
+
+
+def record_transactions(ledger_file, transaction_type, date, stocks, numbers_of_shares, amounts, fees):
+    '''
+    Records transactions of the same type for several stocks in a ledger.
+
+    Input:
+        ledger_file (str, Ledger or None): path to the ledger file, a Ledger, or None
+            to record nothing.
+        Other inputs: see Ledger.record_many().
+    '''
+    if ledger_file is None:
+        return
+    if isinstance(ledger_file, str):
+        # Write all the lines at once
+        with Ledger(ledger_file) as ledger:
+            ledger.record_many(transaction_type, date, stocks, numbers_of_shares, amounts, fees)
+    else:
+        ledger_file.record_many(transaction_type, date, stocks, numbers_of_shares, amounts, fees)
+
+
+def buy_fills(to_buy, available_capital, prices, fees):
+    '''
+    Shares, amounts and fees of purchases, with the fill rules of Portfolio.buy_many():
+    as many shares as available_capital pays for at the buy price, fees included.
+    Works on arrays of any shape, e.g. (strategies x stocks) for several strategies.
+
+    Input:
+        to_buy (ndarray): boolean array, True for the stocks to buy. They must have a price.
+        available_capital (float or ndarray): the maximum amount to spend on each stock,
+            this must also cover fees (broadcast against to_buy).
+        prices (ndarray): the prices of the data (broadcast against to_buy),
+            ignored where to_buy is False.
+        fees (float or CostModel): transaction fees (fixed amount per transaction),
+            or the cost model of the transactions
+
+    Output:
+        number (ndarray): the number of shares bought (int64).
+        total (ndarray): the money spent (negative), fees included.
+        fees (ndarray): the fees paid.
+        All three are 0 where to_buy is False, or where the capital does not buy a
+        single share: no purchase is made and no fees are paid.
+    '''
+    to_buy = np.asarray(to_buy, dtype=bool)
+    model = costs.as_cost_model(fees)
+    prices = model.buy_prices(np.where(to_buy, prices, 1))
+    # Calculate how many shares each investment can buy
+    number = np.where(to_buy, model.affordable(np.broadcast_to(available_capital, to_buy.shape), prices), 0)
+    bought = number > 0
+    fees = np.where(bought, model.fees(number * prices), 0)
+    total = np.where(bought, -(number * prices + fees), 0)
+    return number, total, fees
+
+
+def sell_fills(numbers, prices, fees):
+    '''
+    Amounts and fees of sales, with the fill rules of Portfolio.sell_many().
+    Works on arrays of any shape, e.g. (strategies x stocks) for several strategies.
+
+    Input:
+        numbers (ndarray): the number of shares to sell of each stock, 0 for no sale.
+            The stocks sold must have a price.
+        prices (ndarray): the prices of the data (broadcast against numbers),
+            ignored where nothing is sold.
+        fees (float or CostModel): transaction fees (fixed amount per transaction),
+            or the cost model of the transactions
+
+    Output:
+        total (ndarray): the money earned (positive), fees deducted.
+        fees (ndarray): the fees paid.
+        Both are 0 where nothing is sold.
+    '''
+    sold = np.asarray(numbers) > 0
+    model = costs.as_cost_model(fees)
+    prices = model.sell_prices(np.where(sold, prices, 1))
+    fees = np.where(sold, model.fees(numbers * prices), 0)
+    total = np.where(sold, numbers * prices - fees, 0)
+    return total, fees
+
+
+class Portfolio:
+    '''
+    Positions of a portfolio, held in NumPy arrays with one value per stock.
+
+    Attributes:
+        shares (ndarray): number of shares held of each stock (int64).
+        avg_cost (ndarray): average cost of a share held, fees included.
+        realized (ndarray): profit or loss made on the shares already sold.
+        cash (float): cash earned (positive) or spent (negative) since the start,
+            plus the initial cash.
+        history (ndarray): shares held at the end of each day (None unless days is given).
+
+    Input:
+        n_stocks (int): number of stocks.
+        cash (float, default 0): initial cash.
+        days (int, default None): number of days, to keep the daily shares in history.
+
+    A Portfolio can be used like the list returned by create_portfolio() before:
+    portfolio[stock] is the number of shares of a stock.
+
+    Example:
+        >>> portfolio = Portfolio(20, cash=100000, days=1825)
+        >>> portfolio.buy_many(21, [0, 3, 7], 1000, sim_data, 30)
+    '''
+    __slots__ = ('shares', 'avg_cost', 'realized', 'cash', 'history', '_marked')
+
+    def __init__(self, n_stocks, cash=0.0, days=None):
+        self.shares = np.zeros(n_stocks, dtype=np.int64)
+        self.avg_cost = np.zeros(n_stocks)
+        self.realized = np.zeros(n_stocks)
+        self.cash = float(cash)
+        self.history = None
+        self._marked = None
+        if days is not None:
+            self.history = np.zeros((days, n_stocks), dtype=np.int64)
+            # Days with a change of position, the other days are filled in later
+            self._marked = np.zeros(days, dtype=bool)
+
+    def __len__(self):
+        return len(self.shares)
+
+    def __getitem__(self, stock):
+        return self.shares[stock]
+
+    def __setitem__(self, stock, number_of_shares):
+        self.shares[stock] = number_of_shares
+
+    def __iter__(self):
+        return iter(self.shares.tolist())
+
+    def __array__(self, dtype=None, copy=None):
+        return np.array(self.shares, dtype=dtype)
+
+    def __repr__(self):
+        return 'Portfolio(shares=' + str(self.shares.tolist()) + ', cash=' + str(round(self.cash, 2)) + ')'
+
+    def _snapshot(self, date):
+        if self.history is not None:
+            self.history[date] = self.shares
+            self._marked[date] = True
+
+    def buy_many(self, date, stocks, available_capital, stock_prices, fees, ledger_file=None):
+        '''
+        Buys shares of several stocks, with a certain amount of money available for each,
+        as buy() does for one stock. Stocks without a price that day, or whose capital
+        does not buy a single share (fees included), are skipped.
+
+        Input:
+            date (int): the date of the transactions (nb of days since day 0)
+            stocks (ndarray): the stocks we want to buy
+            available_capital (float or ndarray): the maximum amount to spend on each stock,
+                this must also cover fees
+            stock_prices (ndarray): the stock price data
+            fees (float or CostModel): transaction fees (fixed amount per transaction),
+                or the cost model of the transactions
+            ledger_file (str, Ledger or None, default None): where to record the transactions
+
+        Output: None
+        '''
+        stocks = np.asarray(stocks, dtype=np.int64)
+        prices = stock_prices[date, stocks]
+        valid = ~np.isnan(prices)
+        available_capital = np.broadcast_to(available_capital, stocks.shape)[valid]
+        stocks, prices = stocks[valid], prices[valid]
+        if len(stocks) == 0:
+            return
+        number, total, fees = buy_fills(np.ones(len(stocks), dtype=bool), available_capital, prices, fees)
+        # Nothing is bought, and no fees are paid, when the capital does not buy a share
+        bought = number > 0
+        stocks, number, total, fees = stocks[bought], number[bought], total[bought], fees[bought]
+        if len(stocks) == 0:
+            return
+        held = self.shares[stocks] + number
+        # The cost of the new shares, fees included, joins the average cost
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cost = np.where(held > 0, (self.avg_cost[stocks] * self.shares[stocks] - total) / held, 0)
+        self.avg_cost[stocks] = cost
+        self.shares[stocks] = held
+        self.cash += total.sum()
+        self._snapshot(date)
+        record_transactions(ledger_file, 'buy', date, stocks, number, total, fees)
+
+    def sell_many(self, date, stocks, stock_prices, fees, ledger_file=None, numbers=None):
+        '''
+        Sells all shares of several stocks, as sell() does for one stock, or only
+        some of them. Stocks without shares or without a price that day are skipped.
+
+        Input:
+            date (int): the date of the transactions (nb of days since day 0)
+            stocks (ndarray): the stocks we want to sell
+            stock_prices (ndarray): the stock price data
+            fees (float or CostModel): transaction fees (fixed amount per transaction),
+                or the cost model of the transactions
+            ledger_file (str, Ledger or None, default None): where to record the transactions
+            numbers (ndarray, default None): the number of shares to sell of each stock
+                (at most the shares held), None to sell them all
+
+        Output: None
+        '''
+        stocks = np.asarray(stocks, dtype=np.int64)
+        prices = stock_prices[date, stocks]
+        number = self.shares[stocks]
+        if numbers is not None:
+            number = np.minimum(number, np.broadcast_to(numbers, stocks.shape)).astype(np.int64)
+        valid = (number > 0) & ~np.isnan(prices)
+        stocks, prices, number = stocks[valid], prices[valid], number[valid]
+        if len(stocks) == 0:
+            return
+        total, fees = sell_fills(number, prices, fees)
+        self.realized[stocks] += total - self.avg_cost[stocks] * number
+        self.cash += total.sum()
+        self.shares[stocks] -= number
+        # The average cost of the shares still held does not change
+        self.avg_cost[stocks] = np.where(self.shares[stocks] > 0, self.avg_cost[stocks], 0)
+        self._snapshot(date)
+        record_transactions(ledger_file, 'sell', date, stocks, number, total, fees)
+
+    def value(self, prices):
+        '''
+        Returns the cash plus the value of the shares held at the given prices
+        (one per stock). Stocks without a price are worth nothing.
+        '''
+        return self.cash + np.sum(self.shares * np.where(np.isnan(prices), 0, prices))
+
+    def holdings_history(self):
+        '''
+        Returns the shares held at the end of each day (days x stocks).
+        Only available if the portfolio was created with days.
+        '''
+        # Each day takes the shares of the last day with a change of position,
+        # row 0 holds no shares until the first change
+        last = np.maximum.accumulate(np.where(self._marked, np.arange(len(self._marked)), 0))
+        return self.history[last]
+
 
 def log_transaction(transaction_type, date, stock, number_of_shares, price, fees, ledger_file):
     '''
@@ -12,7 +408,8 @@ def log_transaction(transaction_type, date, stock, number_of_shares, price, fees
         number_of_shares (int): the number of shares bought or sold
         price (float): the price of a share at the time of the transaction
         fees (float): transaction fees (fixed amount per transaction, independent of the number of shares)
-        ledger_file (str): path to the ledger file
+        ledger_file (str or Ledger): path to the ledger file, or a Ledger collecting
+            the transactions in memory
     
     Output: returns None.
         Writes one line in the ledger file to record a transaction with the input information.
@@ -26,10 +423,14 @@ def log_transaction(transaction_type, date, stock, number_of_shares, price, fees
         buy,5,2,10,100.00,-1050.00
             >>> log_transaction('buy', 5, 2, 10, 100, 50, 'ledger.txt')
     '''
+    if isinstance(ledger_file, Ledger):
+        # Keep the transaction in memory, the ledger writes it out in batches
+        ledger_file.record(transaction_type, date, stock, number_of_shares, price, fees)
+        return
     # Open the file in append mode, if there is no file, the file is created
     f = open(ledger_file,'a+')
     # Write the required data to a file
-    f.write(transaction_type+','+str(date)+','+str(stock)+','+str(number_of_shares)+','+str(price)+'\n')
+    f.write(format_transaction(transaction_type, date, stock, number_of_shares, price))
     # Close the file when a write is complete
     f.close()
 
@@ -45,9 +446,10 @@ def buy(date, stock, available_capital, stock_prices, fees, portfolio, ledger_fi
         available_capital (float): the total (maximum) amount to spend,
             this must also cover fees
         stock_prices (ndarray): the stock price data
-        fees (float): total transaction fees (fixed amount per transaction)
-        portfolio (list): our current portfolio
-        ledger_file (str): path to the ledger file
+        fees (float or CostModel): total transaction fees (fixed amount per transaction),
+            or the cost model of the transaction
+        portfolio (list or Portfolio): our current portfolio
+        ledger_file (str or Ledger): path to the ledger file, or a Ledger
     
     Output: None
 
@@ -55,6 +457,17 @@ def buy(date, stock, available_capital, stock_prices, fees, portfolio, ledger_fi
         Spend at most 1000 to buy shares of stock 7 on day 21, with fees 30:
             >>> buy(21, 7, 1000, sim_data, 30, portfolio)
     '''
+    if isinstance(portfolio, Portfolio):
+        # The portfolio keeps its cash and cost basis up to date
+        portfolio.buy_many(date, [stock], available_capital, stock_prices, fees, ledger_file)
+        return
+    if isinstance(fees, costs.CostModel):
+        # Cost models work on arrays, buy through a Portfolio holding this stock
+        positions = Portfolio(len(portfolio))
+        positions.shares[stock] = portfolio[stock]
+        positions.buy_many(date, [stock], available_capital, stock_prices, fees, ledger_file)
+        portfolio[stock] = positions.shares[stock].item()
+        return
     # Calculate total expenditure
     if not np.isnan(stock_prices[date,stock]):
         # Calculate how many shares an investment can buy
@@ -74,9 +487,10 @@ def sell(date, stock, stock_prices, fees, portfolio, ledger_file):
         date (int): the date of the transaction (nb of days since day 0)
         stock (int): the stock we want to sell
         stock_prices (ndarray): the stock price data
-        fees (float): transaction fees (fixed amount per transaction)
-        portfolio (list): our current portfolio
-        ledger_file (str): path to the ledger file
+        fees (float or CostModel): transaction fees (fixed amount per transaction),
+            or the cost model of the transaction
+        portfolio (list or Portfolio): our current portfolio
+        ledger_file (str or Ledger): path to the ledger file, or a Ledger
     
     Output: None
 
@@ -84,6 +498,15 @@ def sell(date, stock, stock_prices, fees, portfolio, ledger_file):
         To sell all our shares of stock 1 on day 8, with fees 20:
             >>> sell(8, 1, sim_data, 20, portfolio)
     '''
+    if isinstance(portfolio, Portfolio):
+        portfolio.sell_many(date, [stock], stock_prices, fees, ledger_file)
+        return
+    if isinstance(fees, costs.CostModel):
+        positions = Portfolio(len(portfolio))
+        positions.shares[stock] = portfolio[stock]
+        positions.sell_many(date, [stock], stock_prices, fees, ledger_file)
+        portfolio[stock] = positions.shares[stock].item()
+        return
     # Use the portfolio to determine how many stocks can be sold, sell them all
     if portfolio[stock] > 0:
         if not np.isnan(stock_prices[date,stock]):
@@ -93,7 +516,7 @@ def sell(date, stock, stock_prices, fees, portfolio, ledger_file):
             # Update portfolio
             portfolio[stock] = 0
 
-def create_portfolio(available_amounts, stock_prices, fees):
+def create_portfolio(available_amounts, stock_prices, fees, ledger_file='ledger.txt'):
     '''
     Create a portfolio by buying a given number of shares of each stock.
     
@@ -101,10 +524,12 @@ def create_portfolio(available_amounts, stock_prices, fees):
         available_amounts (list): how much money we allocate to the initial
             purchase for each stock (this should cover fees)
         stock_prices (ndarray): the stock price data
-        fees (float): transaction fees (fixed amount per transaction)
+        fees (float or CostModel): transaction fees (fixed amount per transaction),
+            or the cost model of the transactions
+        ledger_file (str or Ledger, default 'ledger.txt'): path to the ledger file, or a Ledger
     
     Output:
-        portfolio (list): our initial portfolio
+        portfolio (Portfolio): our initial portfolio
 
     Example:
         Spend 1000 for each stock (including 40 fees for each purchase):
@@ -112,10 +537,9 @@ def create_portfolio(available_amounts, stock_prices, fees):
         >>> portfolio = create_portfolio([1000] * N, sim_data, 40)
     '''
     # The default number of shares held is 0
-    portfolio = [0] * len(available_amounts)
-    # Use the given budget and stock price to buy stocks, for loop
-    for nums in range(0,len(available_amounts)):
-        # Call function buy
-        buy(0, nums, available_amounts[nums], stock_prices, fees, portfolio, 'ledger.txt')
+    portfolio = Portfolio(len(available_amounts))
+    # Use the given budget and stock price to buy all stocks at once
+    portfolio.buy_many(0, np.arange(len(available_amounts)), np.asarray(available_amounts, dtype=float),
+                       stock_prices, fees, ledger_file)
     # Return of initial Holdings
     return portfolio
@@ -0,0 +1,143 @@
+# Rolling-window computations shared by the indicators.
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+# Values are summed as integers in units of 1e-8. Prices with two decimals (as
+# in the data file), or up to 8, are whole numbers of units: their sums are exact
+# and do not depend on the order of the additions. Values with more decimals
+# (e.g. generated prices) are rounded to the nearest unit first, so their sums
+# are off by at most 5e-9 per value in the window
+UNITS = 10**8
+
+# Largest sum of a window, in units, that fits in an int64
+MAX_UNITS = 2**63 - 1
+
+
+def to_units(values, n=1):
+    '''
+    Converts values to whole numbers of units (1e-8) for exact sums.
+
+    Input:
+        values (ndarray): data over time (axis 0), one column per stock if 2-D.
+        n (int, default 1): length of the windows that will be summed.
+
+    Output:
+        units (ndarray): the values rounded to the nearest unit, as int64, 0 where missing.
+        missing (ndarray): True where the value is NaN (or infinite).
+
+    Raises ValueError if the sum of n values could exceed the int64 range
+    (about 9.2e10 / n in absolute value).
+    '''
+    values = np.asarray(values, dtype=float)
+    missing = ~np.isfinite(values)
+    values = np.where(missing, 0, values)
+    if values.size and np.abs(values).max() * UNITS * max(n, 1) >= MAX_UNITS:
+        raise ValueError('Values up to ' + str(np.abs(values).max()) + ' are too large to sum ' + str(n)
+                         + ' of them in units of 1e-8')
+    units = np.rint(values * UNITS).astype(np.int64)
+    return units, missing
+
+
+def cumulative_sums(values, n=1):
+    '''
+    Running totals used by rolling_sum().
+
+    Input:
+        values (ndarray): data over time (axis 0), one column per stock if 2-D.
+
+        n (int, default 1): length of the windows that will be summed, see to_units().
+
+    Output:
+        totals (ndarray): running sum of the values in units (see to_units()),
+            NaN counted as 0, with a row of zeros in front (one row longer than values).
+            Long series may wrap around the int64 range, the difference of two
+            totals at most n rows apart is still exact.
+        nans (ndarray): running count of NaN values, same shape as totals.
+    '''
+    units, missing = to_units(values, n)
+    totals = np.zeros((len(units) + 1,) + units.shape[1:], dtype=np.int64)
+    nans = np.zeros((len(units) + 1,) + units.shape[1:], dtype=np.int64)
+    # NaN would spoil every later total, so count it apart
+    np.cumsum(units, axis=0, out=totals[1:])
+    np.cumsum(missing, axis=0, out=nans[1:])
+    return totals, nans
+
+
+def rolling_sum(values, n, divisor=1):
+    '''
+    Sum of the values over every window of n consecutive days, in O(days).
+
+    The running totals are integers (see to_units()), so the sums of values with
+    at most 8 decimals are exact and only rounded by the final division: windows
+    with the same total give exactly the same result, whatever their values and
+    their length. Values with more decimals are rounded to 1e-8 first.
+
+    Input:
+        values (ndarray): data over time (axis 0), one column per stock if 2-D.
+        n (int): length of the window (in days).
+        divisor (int, default 1): the sums are divided by it before rounding,
+            n gives the averages.
+
+    Output:
+        sums (ndarray): one row per complete window (len(values) - n + 1 rows),
+            the row i is the sum of values[i:i+n] / divisor. Windows containing NaN give NaN.
+
+    Raises ValueError for values too large to sum, see to_units().
+    '''
+    totals, nans = cumulative_sums(values, n)
+    # The sum over a window is the difference of two running totals
+    sums = (totals[n:] - totals[:len(totals) - n]) / (UNITS * divisor)
+    sums[nans[n:] - nans[:len(nans) - n] > 0] = np.nan
+    return sums
+
+
+def rolling_weighted_sum(values, weights):
+    '''
+    Weighted sum of the values over every window of len(weights) consecutive days.
+
+    Input:
+        values (ndarray): data over time (axis 0), one column per stock if 2-D.
+        weights (ndarray): weight of each day in the window, oldest day first.
+
+    Output:
+        sums (ndarray): one row per complete window, the row i is
+            the sum of values[i+k] * weights[k].
+    '''
+    values = np.asarray(values, dtype=float)
+    n = len(weights)
+    length = len(values) - n + 1
+    # Convolve tap by tap: one vectorised pass over the data per weight
+    sums = weights[0] * values[0:length]
+    for k in range(1, n):
+        sums = sums + weights[k] * values[k:k + length]
+    return sums
+
+
+def rolling_min(values, n):
+    '''
+    Minimum of the values over every window of n consecutive days.
+
+    Input:
+        values (ndarray): data over time (axis 0), one column per stock if 2-D.
+        n (int): length of the window (in days).
+
+    Output:
+        lows (ndarray): one row per complete window (len(values) - n + 1 rows).
+    '''
+    # Strided view of all the windows, no copy of the data
+    return sliding_window_view(np.asarray(values, dtype=float), n, axis=0).min(axis=-1)
+
+
+def rolling_max(values, n):
+    '''
+    Maximum of the values over every window of n consecutive days.
+
+    Input:
+        values (ndarray): data over time (axis 0), one column per stock if 2-D.
+        n (int): length of the window (in days).
+
+    Output:
+        highs (ndarray): one row per complete window (len(values) - n + 1 rows).
+    '''
+    return sliding_window_view(np.asarray(values, dtype=float), n, axis=0).max(axis=-1)
@@ -1,7 +1,7 @@
 # Functions to implement our trading strategy.
 import numpy as np
-import trading.process as proc
 import trading.indicators as indi
+import trading.backtest as bt
 
 def random(stock_prices,portfolio,period=7, amount=5000, fees=20, ledger='ledger_random.txt'):
     '''
@@ -11,37 +11,21 @@ def random(stock_prices,portfolio,period=7, amount=5000, fees=20, ledger='ledger
 
     Input:
         stock_prices (ndarray): the stock price data
+        portfolio (list): our current portfolio, updated in-place
         period (int, default 7): how often we buy/sell (days)
         amount (float, default 5000): how much we spend on each purchase
             (must cover fees)
         fees (float, default 20): transaction fees
-        ledger (str): path to the ledger file
+        ledger (str or Ledger): path to the ledger file, or a Ledger
 
     Output: None
     '''
-    # Calculate effective length
-    length = (len(stock_prices[:,0]) - 1) - (len(stock_prices[:,0]) - 1) % period
-    # Calculate the number of types of stock
-    stocks = len(stock_prices[0])
-    for day in range(1, length, period):
-        choice = ['buy','sell','nothing']
-        # Random select behavior
-        rng = np.random.default_rng()
-        action = rng.choice(choice)
-        if action == 'buy':
-            # for loop traverse each stock
-            for stock in range(0,stocks):
-                # buy stock
-                proc.buy(day, stock, amount, stock_prices, fees, portfolio, ledger)
-        elif action == 'sell':
-            # for loop traverse each stock
-            for stock in range(0, stocks):
-                # sell all stock
-                proc.sell(day,stock,stock_prices,fees,portfolio,ledger)
-        else:
-            pass
+    # Random select behavior for every period
+    buy, sell = bt.random_signals(len(stock_prices), stock_prices.shape[1], period)
+    # Buy or sell every stock on the chosen days, in a single pass over the days
+    bt.run_signals(buy, sell, stock_prices, amount, fees, portfolio, ledger)
 
-def crossing_averages(n,m,stock_prices,available_capital,fees,portfolio,ledger = 'ledger_crossing_averages.txt'):
+def crossing_averages(n,m,stock_prices,available_capital,fees,portfolio,ledger = 'ledger_crossing_averages.txt',cache=None):
     '''
         The relationship between the moving average curve determines whether to buy or sell
 
@@ -51,32 +35,25 @@ def crossing_averages(n,m,stock_prices,available_capital,fees,portfolio,ledger =
             available_capital(float): Budget for each stock purchased each time
             fees(float): Cost per transaction
             portfolio
-            ledger(str): File to store purchase information
-        Output: purchase point
+            ledger(str or Ledger): File to store purchase information
+            cache(IndicatorCache, default None): Cache for the moving averages
+        Output: purchase point, [buy days, sell days] of the crossings for each stock
         '''
-    for stocks in range(len(stock_prices[0])):
-        # Calculate the FMA and SMA of each stock
-        FMA = indi.moving_average(stock_prices[:,stocks], m)
-        SMA = indi.moving_average(stock_prices[:,stocks], n)
-        # Initiate the event list of purchase time and sales
-        buy_point = []
-        sell_point = []
-        final = []
-        # Find the point where the two curves intersect, according to the size of the stock price on the left and right
-        for x in range(1,len(stock_prices)-1):
-            if FMA[x-1] < SMA[x-1] and FMA[x+1] > SMA [x+1]:
-                buy_point.append(x)
-            elif FMA[x-1] > SMA[x-1] and FMA[x+1] < SMA [x+1]:
-                sell_point.append(x)
-        for day in range(len(stock_prices)):
-            if day+1 in buy_point:
-                proc.buy(day,stocks,available_capital,stock_prices,fees,portfolio,ledger)
-            elif day+1 in sell_point:
-                proc.sell(day,stocks,stock_prices,fees,portfolio,ledger)
-        final.append([buy_point,sell_point])
+    # Calculate the FMA and SMA of every stock at once
+    indicators = indi if cache is None else cache
+    FMA = indicators.moving_average(stock_prices, m)
+    SMA = indicators.moving_average(stock_prices, n)
+    # Find the days where the two curves intersect, according to their order on the left and right
+    buy, sell = bt.crossing_signals(FMA, SMA)
+    # Buy and sell all stocks in a single pass over the days
+    bt.run_signals(buy, sell, stock_prices, available_capital, fees, portfolio, ledger)
+    # The crossing itself is the day after the transaction
+    final = []
+    for stocks in range(stock_prices.shape[1]):
+        final.append([(np.nonzero(buy[:, stocks])[0] + 1).tolist(), (np.nonzero(sell[:, stocks])[0] + 1).tolist()])
     return final
 
-def momentum(stock_prices,available_capital,fees,portfolio,n=7,osc_type='stochastic',ledger = 'ledger_momentum.txt'):
+def momentum(stock_prices,available_capital,fees,portfolio,n=7,osc_type='stochastic',ledger = 'ledger_momentum.txt',buy_range=(0.2,0.3),sell_range=(0.7,0.8),cache=None):
     '''
         OSC decides whether to buy or sell
 
@@ -84,35 +61,20 @@ def momentum(stock_prices,available_capital,fees,portfolio,n=7,osc_type='stochas
             stock_prices(array): All prices of all stocks
             available_capital(float): Budget for each stock purchased each time
             fees(float): Cost per transaction
-            fees(float): Cost per transaction
             portfolio
-            ledger(str): File to store purchase information
+            n(int, default 7): Oscillator period
+            osc_type(str, default 'stochastic'): Oscillator, 'stochastic' or 'RSI'. Earlier
+                versions always used 'stochastic' and ignored this argument
+            ledger(str or Ledger): File to store purchase information
+            buy_range(tuple, default (0.2, 0.3)): Buy when OSC is inside this band
+            sell_range(tuple, default (0.7, 0.8)): Sell when OSC is inside this band
+            cache(IndicatorCache, default None): Cache for the oscillator
         Output: None
         '''
-    for stocks in range(len(stock_prices[0])):
-        # Calculate OSC
-        result = indi.oscillator(stock_prices[:,stocks], n=n, osc_type='stochastic').tolist()
-        # Initiate the event list of purchase time and sales
-        buy_point = []
-        sell_point = []
-        for i in range(0, len(result)):
-            # Judging whether to buy or sell by threshold, the cooling off period for each transaction is 10 days
-            if result[i] > 0.2 and result[i] < 0.3:
-                if len(buy_point) > 0 and len(sell_point) > 0:
-                    if i > max(buy_point[-1],sell_point[-1]) + 5:
-                        buy_point.append(i)
-                else:
-                    buy_point.append(i)
-            elif result[i] > 0.7 and result[i] < 0.8:
-                if len(buy_point) > 0 and len(sell_point) > 0:
-                    if i > max(buy_point[-1],sell_point[-1]) + 5:
-                        sell_point.append(i)
-                else:
-                    sell_point.append(i)
-        # Buy and sell stocks according to the time just set
-        for day in range(len(stock_prices)):
-            if day+1 in buy_point:
-                proc.buy(day,stocks,available_capital,stock_prices,fees,portfolio,ledger)
-            elif day+1 in sell_point:
-                proc.sell(day,stocks,stock_prices,fees,portfolio,ledger)
-
+    # Calculate OSC for every stock at once
+    indicators = indi if cache is None else cache
+    result = indicators.oscillator(stock_prices, n=n, osc_type=osc_type)
+    # Judging whether to buy or sell by threshold, with a cooling off period between transactions
+    buy, sell = bt.threshold_signals(result, buy_range, sell_range)
+    # Buy and sell all stocks in a single pass over the days
+    bt.run_signals(buy, sell, stock_prices, available_capital, fees, portfolio, ledger)
@@ -0,0 +1,239 @@
+# Indicators updated one day at a time, for live or bar-by-bar backtests.
+from collections import deque
+import numpy as np
+import trading.rolling as rolling
+
+
+class RollingSum:
+    '''
+    Sum of the last n values, updated in O(1) with a running total.
+
+    The running total is an integer number of units, as in
+    trading.rolling.rolling_sum(), so both give exactly the same results.
+
+    Input:
+        n (int): length of the window (in days).
+        divisor (int, default 1): the sums are divided by it before rounding.
+    '''
+    def __init__(self, n, divisor=1):
+        self.n = n
+        self.divisor = divisor
+        self.count = 0
+        self.total = 0
+        self.nans = 0
+        # Ring buffer with the running totals (and NaN counts) of the last n days
+        self.totals = [0] * max(n, 1)
+        self.nan_totals = [0] * max(n, 1)
+
+    def update(self, value):
+        '''
+        Adds the value of a new day.
+
+        Input:
+            value (float or ndarray): the new value, or one value per stock.
+
+        Output:
+            total (float or ndarray): sum of the last n values, NaN if one of them is NaN.
+                None until n values have been added.
+        '''
+        units, missing = rolling.to_units(value, self.n)
+        self.count += 1
+        if self.n == 0:
+            return np.zeros(units.shape)[()]
+        self.total = self.total + units
+        self.nans = self.nans + missing
+        # The slot of the running total n days ago gets today's total
+        slot = self.count % self.n
+        old_total, old_nans = self.totals[slot], self.nan_totals[slot]
+        self.totals[slot] = self.total
+        self.nan_totals[slot] = self.nans
+        if self.count < self.n:
+            return None
+        total = (self.total - old_total) / (rolling.UNITS * self.divisor)
+        return np.where(self.nans - old_nans > 0, np.nan, total)[()]
+
+
+class MovingAverage:
+    '''
+    n-day moving average, updated one day at a time.
+    Gives the same values as trading.indicators.moving_average().
+
+    Input:
+        n (int, default 7): period of the moving average (in days).
+
+    Example:
+        >>> ma = MovingAverage(50)
+        >>> for day in range(len(sim_data)):
+        ...     level = ma.update(sim_data[day])
+    '''
+    def __init__(self, n=7):
+        self.n = n
+        self.sum = RollingSum(n, divisor=n)
+
+    def update(self, price):
+        '''
+        Input:
+            price (float or ndarray): today's share price, or one price per stock.
+
+        Output:
+            ma (float or ndarray): today's moving average, NaN for the first n-1 days.
+        '''
+        ma = self.sum.update(price)
+        if ma is None:
+            return np.full(np.shape(price), np.nan)[()]
+        return ma
+
+
+class WeightedMovingAverage:
+    '''
+    Weighted moving average, updated one day at a time.
+    Gives the same values as trading.indicators.moving_average() with weights.
+
+    Each update costs O(n): every weight is applied to the day it goes with.
+
+    Input:
+        weights (list): the weight of each day in the window, oldest day first.
+    '''
+    def __init__(self, weights):
+        self.weights = weights
+        self.n = len(weights)
+        self.count = 0
+        # Ring buffer with the prices of the last n days
+        self.window = [None] * self.n
+
+    def update(self, price):
+        '''
+        Input:
+            price (float or ndarray): today's share price, or one price per stock.
+
+        Output:
+            ma (float or ndarray): today's weighted moving average, NaN for the first n-1 days.
+        '''
+        price = np.asarray(price, dtype=float)
+        self.window[self.count % self.n] = price
+        self.count += 1
+        if self.count < self.n:
+            return np.full(price.shape, np.nan)[()]
+        # Oldest price first, as in trading.rolling.rolling_weighted_sum()
+        first = self.count % self.n
+        total = self.weights[0] * self.window[first]
+        for k in range(1, self.n):
+            total = total + self.weights[k] * self.window[(first + k) % self.n]
+        return (total / sum(self.weights))[()]
+
+
+class _MonotonicWindow:
+    '''
+    Minimum and maximum over the last n values of one stock, with monotonic deques
+    (O(1) amortized per update). NaN values are counted but not stored.
+    '''
+    def __init__(self, n):
+        self.n = n
+        self.lows = deque()
+        self.highs = deque()
+        self.nan_days = deque()
+
+    def update(self, day, value):
+        # Drop the days that left the window
+        while self.lows and self.lows[0][0] <= day - self.n:
+            self.lows.popleft()
+        while self.highs and self.highs[0][0] <= day - self.n:
+            self.highs.popleft()
+        while self.nan_days and self.nan_days[0] <= day - self.n:
+            self.nan_days.popleft()
+        if np.isnan(value):
+            self.nan_days.append(day)
+        else:
+            # A new value hides every older value that is not lower (or higher)
+            while self.lows and self.lows[-1][1] >= value:
+                self.lows.pop()
+            self.lows.append((day, value))
+            while self.highs and self.highs[-1][1] <= value:
+                self.highs.pop()
+            self.highs.append((day, value))
+        if self.nan_days:
+            return np.nan, np.nan
+        return self.lows[0][1], self.highs[0][1]
+
+
+class Stochastic:
+    '''
+    Stochastic oscillator with a period of n days, updated one day at a time.
+    Gives the same values as trading.indicators.oscillator() with osc_type='stochastic'.
+
+    Input:
+        n (int, default 7): period of the oscillator (in days).
+    '''
+    def __init__(self, n=7):
+        self.n = n
+        self.count = 0
+        self.windows = None
+
+    def update(self, price):
+        '''
+        Input:
+            price (float or ndarray): today's share price, or one price per stock.
+
+        Output:
+            osc (float or ndarray): today's oscillator level, 0 for the first n-1 days.
+        '''
+        price = np.asarray(price, dtype=float)
+        values = price.reshape(-1)
+        if self.windows is None:
+            self.windows = [_MonotonicWindow(self.n) for value in values]
+        day = self.count
+        self.count += 1
+        lows, highs = np.array([window.update(day, value) for window, value in zip(self.windows, values)]).T
+        if self.count < self.n:
+            return np.zeros(price.shape)[()]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            osc = (values - lows) / (highs - lows)
+        return osc.reshape(price.shape)[()]
+
+
+class RSI:
+    '''
+    RSI oscillator with a period of n days, updated one day at a time.
+    Gives the same values as trading.indicators.oscillator() with osc_type='RSI'.
+
+    Input:
+        n (int, default 7): period of the oscillator (in days).
+    '''
+    def __init__(self, n=7):
+        self.n = n
+        self.count = 0
+        self.previous = None
+        # Running sums over the n-1 price differences of the window
+        self.sum_up = RollingSum(n - 1)
+        self.sum_down = RollingSum(n - 1)
+        self.count_up = RollingSum(n - 1)
+
+    def update(self, price):
+        '''
+        Input:
+            price (float or ndarray): today's share price, or one price per stock.
+
+        Output:
+            osc (float or ndarray): today's RSI level, 0 for the first n-1 days.
+        '''
+        price = np.asarray(price, dtype=float)
+        previous, self.previous = self.previous, price
+        self.count += 1
+        if previous is None:
+            # With a 1-day period there are no differences at all, and no fall
+            return np.full(price.shape, 1.0 if self.n == 1 else 0.0)[()]
+        # Separate rises and falls (no change counts as a fall)
+        delta = price - previous
+        rise = delta > 0
+        sum_up = self.sum_up.update(np.where(rise, delta, 0))
+        sum_down = self.sum_down.update(np.where(rise, 0, -delta))
+        count_up = self.count_up.update(rise)
+        if self.count < self.n:
+            return np.zeros(price.shape)[()]
+        count_down = (self.n - 1) - count_up
+        with np.errstate(divide='ignore', invalid='ignore'):
+            aver_po = sum_up / count_up
+            aver_ne = sum_down / count_down
+            level = aver_po / (aver_po + aver_ne)
+        # If only rise no fall, RSI = 1, if only fall no rise, RSI = 0
+        return np.where(count_down == 0, 1, np.where(count_up == 0, 0, level))[()]
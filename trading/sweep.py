@@ -0,0 +1,159 @@
+# Run a strategy over a grid of parameters in parallel.
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import trading.backtest as bt
+import trading.indicators as indi
+import trading.process as proc
+import trading.performance as perf
+
+# Price data of the worker process, attached to the shared memory block
+_shared = {}
+
+
+def _attach(name, shape, dtype, cache):
+    '''
+    Worker initializer: maps the shared price data without copying it.
+    '''
+    _shared['cache'] = cache
+    block = shared_memory.SharedMemory(name=name)
+    # Keep a reference to the block, the array is only valid while it is open
+    _shared['block'] = block
+    _shared['prices'] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+
+def run_config(strategy_name, params, stock_prices, available_capital, fees, cache=None):
+    '''
+    Runs one strategy configuration on an empty portfolio with an in-memory ledger.
+
+    Input:
+        strategy_name (str): 'random', 'crossing_averages' or 'momentum'
+        params (dict): parameters of the strategy, see trading.backtest.strategy_signals()
+        stock_prices (ndarray): the stock price data
+        available_capital (float): budget for each purchase
+        fees (float): transaction fees
+        cache (IndicatorCache, default None): cache for the indicators
+
+    Output:
+        pnl (float): final profit or loss, cash plus the value of the shares held on the last day
+        trades (int): number of transactions
+        max_drawdown_amount (float): largest drop of the equity curve from a previous peak,
+            in money (not a fraction of the peak as the max_drawdown of trading.performance)
+        min_equity (float): lowest value of the equity curve
+    '''
+    portfolio = [0] * stock_prices.shape[1]
+    # Each run has its own ledger, nothing is written to disk
+    ledger = proc.Ledger()
+    buy, sell = bt.strategy_signals(strategy_name, stock_prices, params, indi if cache is None else cache)
+    bt.run_signals(buy, sell, stock_prices, available_capital, fees, portfolio, ledger)
+    equity = perf.equity_curve(ledger, stock_prices)
+    drawdown = np.maximum.accumulate(equity) - equity
+    return equity[-1], len(ledger), drawdown.max(), equity.min()
+
+
+def _run_shared(task):
+    '''
+    Worker task: runs one configuration on the shared price data.
+    Returns the results, and the hits and misses of the cache during the run.
+    '''
+    strategy_name, params, available_capital, fees = task
+    cache = _shared['cache']
+    if cache is None:
+        return run_config(strategy_name, params, _shared['prices'], available_capital, fees), None
+    before = cache.counters()
+    row = run_config(strategy_name, params, _shared['prices'], available_capital, fees, cache)
+    after = cache.counters()
+    return row, {name: after[name] - before[name] for name in after}
+
+
+def parameter_values(values):
+    '''
+    Converts the values of a parameter in a grid to an array without Python objects,
+    so that saved results can be read back without pickle.
+
+    Input:
+        values (list): the values of the parameter, see sweep().
+
+    Output:
+        values (ndarray): the values, with None as NaN among numbers, and as strings
+            (like every other value) when the values are not all numbers.
+
+    Example:
+        >>> parameter_values([None, 3])
+        array([nan,  3.])
+    '''
+    values = np.asarray(values)
+    if values.dtype != object:
+        return values
+    numbers = [np.nan if value is None else value for value in values.ravel().tolist()]
+    try:
+        return np.array(numbers, dtype=float).reshape(values.shape)
+    except (TypeError, ValueError):
+        return values.astype(str)
+
+
+def sweep(strategy_name, grid, stock_prices, available_capital=5000, fees=20, workers=None, cache=None):
+    '''
+    Runs a strategy for every combination of parameters in a grid, in a process pool.
+
+    The price data is placed once in shared memory and every worker maps it.
+    Each run uses its own in-memory ledger and an empty portfolio.
+
+    Input:
+        strategy_name (str): 'random', 'crossing_averages' or 'momentum'
+        grid (dict): list of values for each parameter of the strategy (see
+            trading.backtest.strategy_signals()), every combination is run.
+        stock_prices (ndarray): the stock price data
+        available_capital (float, default 5000): budget for each purchase
+        fees (float, default 20): transaction fees
+        workers (int, default None): number of worker processes, os.cpu_count() if None.
+            With 0, the runs happen one after the other in this process.
+        cache (IndicatorCache, default None): cache for the indicators, the same
+            indicator is then computed once per worker (once overall with a cache_dir).
+            The hits and misses of the workers are added to its counters.
+
+    Output:
+        results (ndarray): structured array with one row per combination: a field for
+            each parameter (see parameter_values()), then 'pnl', 'trades',
+            'max_drawdown_amount' and 'min_equity'.
+
+    Example:
+        Try 3 x 2 pairs of periods for the moving averages:
+            >>> results = sweep('crossing_averages', {'n': [100, 150, 200], 'm': [20, 50]}, sim_data)
+            >>> results[np.argmax(results['pnl'])]
+    '''
+    names = list(grid)
+    configs = [dict(zip(names, values)) for values in itertools.product(*grid.values())]
+    if workers == 0:
+        rows = [run_config(strategy_name, params, stock_prices, available_capital, fees, cache) for params in configs]
+    else:
+        stock_prices = np.ascontiguousarray(stock_prices)
+        block = shared_memory.SharedMemory(create=True, size=stock_prices.nbytes)
+        try:
+            np.ndarray(stock_prices.shape, dtype=stock_prices.dtype, buffer=block.buf)[:] = stock_prices
+            tasks = [(strategy_name, params, available_capital, fees) for params in configs]
+            with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_attach,
+                                     initargs=(block.name, stock_prices.shape, stock_prices.dtype, cache)) as pool:
+                rows = []
+                for row, counters in pool.map(_run_shared, tasks):
+                    rows.append(row)
+                    # The workers use copies of the cache, count their hits and misses here
+                    if counters is not None:
+                        cache.add_counters(counters)
+        finally:
+            block.close()
+            block.unlink()
+    # One field per parameter (tuples become small arrays), then the statistics
+    columns = {name: parameter_values(grid[name]) for name in names}
+    fields = [(name, values.dtype, values.shape[1:]) for name, values in columns.items()]
+    fields += [('pnl', float), ('trades', np.int64), ('max_drawdown_amount', float), ('min_equity', float)]
+    results = np.zeros(len(configs), dtype=fields)
+    # Same order as configs: the position of the value of each parameter in the grid
+    positions = itertools.product(*(range(len(grid[name])) for name in names))
+    for i, (position, row) in enumerate(zip(positions, rows)):
+        for name, k in zip(names, position):
+            results[i][name] = columns[name][k]
+        results[i]['pnl'], results[i]['trades'], results[i]['max_drawdown_amount'], results[i]['min_equity'] = row
+    return results